@@ -5,15 +5,31 @@ file.
 
 Author: Evan Douglass
 '''
-import turtle
+import random
+from array import array
+from collections import OrderedDict
 
 #### Module constants and global variables ####
 SQUARE = 50                 # pixels - The size of one square on the board.
 DIAMETER = SQUARE - 10      # pixels - The diameter of a single tile.
-SCORES = "./scores.txt"     # A file to track player scores.
-
-window = turtle.Screen()    # Graphics window
-othello = turtle.Turtle()   # A pen to draw in the window
+RADIUS = DIAMETER // 2      # pixels - The radius of a single tile.
+SCORES = "./scores.log"     # A file logging every player score, in the order played.
+HIGH_SCORES = "./scores_top.txt"    # A file of the best scores, highest first.
+HIGH_SCORES_SIZE = 10       # The number of scores kept in the high scores file.
+MOVES_CACHE_SIZE = 1024     # The number of board positions to remember valid moves for.
+DIRECTIONS = ("n", "ne", "e", "se", "s", "sw", "w", "nw")  # Indexed by direction number
+DIRECTION_NUMBERS = {direction: d for d, direction in enumerate(DIRECTIONS)}
+BLACK = 0                   # Player/color numbers, used for self.turn and to index
+WHITE = 1                   # per-color lists.
+COLOR_NAMES = ("black", "white")    # Indexed by color number, for display
+START_COLORS = (BLACK, WHITE, BLACK, WHITE)     # Colors of the center squares, in
+                                                # GameBoard.init_center_squares order
+
+# Graphics globals, set by init_graphics. They stay None when the game logic
+# is used without a display, for example in tests, and nothing is drawn.
+window = None               # Graphics window
+othello = None              # A pen to draw in the window
+window_canvas = None        # The window's Tk canvas, which pieces are drawn on
 
 #### Classes ####
 class GameBoard:
@@ -21,44 +37,126 @@ class GameBoard:
     The GameBoard class represents a board for the game Othello. It also 
     contains the functionality and logic allowing for gameplay, including
     a simple computer player AI.
+
+    Game state is kept apart from drawing. The tiles on the board are two
+    bitboards in self._bb, indexed by color number, and all game logic reads
+    and writes only those. self.pieces holds the GamePiece drawn in each 
+    square and is only touched to draw or recolor a tile.
     '''
     ## SIGNATURE
     # __init__ :: (Object, Integer) => Void
     def __init__(self, n):
         '''
-        Draws the starting board and sets up gameplay.
+        Draws the starting board and sets up gameplay. n is not checked, use
+        from_user_input for a board size that has not been validated.
         int n -- The number of squares on one side of the board (it's length
-            in squares).
+            in squares). An even integer, 4 or more.
+        '''
+        self.init_state(n)
+
+        # Turn off turtle animation so the board is drawn in one repaint
+        # with window.update(), instead of one repaint per turtle command.
+        # Then draw the empty board.
+        if window is not None:
+            window.tracer(0)
+            self.draw_board()
+
+        # Place the starting tiles, which are drawn if there is a window
+        self.draw_start_tiles()
+
+        # Find first valid moves
+        self.valid_moves = self.find_valid_moves()
+
+        # Display turn and set up mouse click event listener
+        if window is not None:
+            self.announce_turn()
+            window.update()
+            window.onclick(self.play)
+
+    ## SIGNATURE
+    # init_state :: (Object, Integer) => Void
+    def init_state(self, n):
+        '''
+        Sets up the board's lookup tables and an empty game state, without
+        drawing anything. Used by __init__ and from_bitboards.
+        int n -- The number of squares on one side of the board (it's length
+            in squares). An even integer, 4 or more.
         '''
-        assert type(n) == int, "n must be an integer."
-        assert n >= 4, "n must be greater than or equal to 4."
-        assert n % 2 != 1, "n must be even."
-        
         self.n = n
+        self._nn = n * n            # The number of squares on the board
         self.size = SQUARE * n      # The size of one side of the board in pixels
-        self.turn = "black"         # The user will go first and is assigned the black pieces
+        self.turn = BLACK           # The user will go first and is assigned the black pieces
+
+        # Board geometry: the first and last index in each location's row
+        self._row_start = array("i", (loc - loc % n for loc in range(self._nn)))
+        self._row_end = array("i", (first + n - 1 for first in self._row_start))
 
         # Game state tracking attributes
-        self.pieces = [None for location in range(n*n)]
+        self.pieces = [None for location in range(self._nn)]    # GamePieces, for drawing only
+        self._bb = [0, 0]           # Bitboards of black and white tiles, bit i is square i
+        self._zobrist = self.init_zobrist()
+        self._hash = 0              # Zobrist hash of the two bitboards
+        self._full_mask = (1 << self._nn) - 1   # Bitboard with every square set
         self.black = 0
         self.white = 0
+        self._moves_cache = OrderedDict()   # (turn, Zobrist hash) => valid moves
         start = -n * SQUARE // 2     # The x & y coordinate of the first square
-        self.squares = self.init_squares(start)
+        self._corner = start
+        self._center_sqs = self.init_center_squares()
+        self._sq_x, self._sq_y, self._sq_cx, self._sq_cy = self.init_squares(start)
+        self._dir_incs, self._dir_end = self.init_direction_tables()
+        self.shifts = self.init_shifts()
+        self.rays = self.init_rays()
 
-        # Draw the empty board
-        self.draw_board()
-
-        # Draw the starting tiles 
-        self.draw_start_tiles()
-
-        # Display turn
-        self.announce_turn()
+    ## SIGNATURE
+    # from_user_input :: (Class, Integer) => GameBoard
+    @classmethod
+    def from_user_input(cls, n):
+        '''
+        Checks a board size given by the user, then makes a board of that size.
+        int n -- The number of squares on one side of the board (it's length
+            in squares).
+        Returns a GameBoard.
+        '''
+        assert type(n) == int, "n must be an integer."
+        assert n >= 4, "n must be greater than or equal to 4."
+        assert n % 2 != 1, "n must be even."
 
-        # Find first valid moves
-        self.valid_moves = self.find_valid_moves()
+        return cls(n)
 
-        # Set up mouse click event listener
-        window.onclick(self.play)
+    ## SIGNATURE
+    # from_bitboards :: (Class, Integer, Integer, Integer, Integer) => GameBoard
+    @classmethod
+    def from_bitboards(cls, n, black, white, turn=BLACK):
+        '''
+        Makes a board with the given tiles on it, set up directly from two 
+        bitboards rather than by playing moves. Nothing is drawn, even if 
+        there is a window, so this suits boards used only for their game 
+        logic, such as in tests or when looking ahead.
+        int n -- The number of squares on one side of the board (it's length
+            in squares). An even integer, 4 or more.
+        int black -- The bitboard of black tiles, bit i is square i.
+        int white -- The bitboard of white tiles. Must not share a bit with black.
+        int turn -- The color number of the player to move.
+        Returns a GameBoard.
+        '''
+        board = cls.__new__(cls)
+        board.init_state(n)
+        board.turn = turn
+
+        # Tiles are tracked but never drawn
+        for color, bb in ((BLACK, black), (WHITE, white)):
+            for location in bit_locations(bb):
+                board.pieces[location] = GamePiece(
+                    location, COLOR_NAMES[color], board._sq_cx[location], 
+                    board._sq_cy[location])
+
+        board._bb = [black, white]
+        board._hash = board.zobrist_hash()
+        board.black = black.bit_count()
+        board.white = white.bit_count()
+        board.valid_moves = board.find_valid_moves()
+        return board
 
     ## SIGNATURE
     # play :: (Object, Integer, Integer) => Void
@@ -75,21 +173,20 @@ class GameBoard:
         window.onclick(None)
 
         # Execute move
-        for square in self.squares:
-            # Search each square on the board for a click and make a play
-            # where there was one, or do nothing if no valid tile was clicked.
-            if square.was_clicked(x, y) and (square.location in self.valid_moves):
-                self.make_move(square.location)
-                break
+        # Make a play where there was a click, or do nothing if no valid 
+        # tile was clicked.
+        location = self.find_clicked_square(x, y)
+        if location in self.valid_moves:
+            self.make_move(location)
         
         # This test is used for games that end with a full board.
         if board.is_full():
             self.end_game()
             # change turn so below block will not execute
-            self.turn = "black"
+            self.turn = BLACK
         
         # If the user made a valid move, it's the computer's turn.
-        if self.turn == "white":
+        if self.turn == WHITE:
             
             # True if the computer made a move, False otherwise
             comp_moved = self.computer_move()
@@ -103,9 +200,35 @@ class GameBoard:
             if not comp_moved and len(self.valid_moves) == 0:
                 self.end_game()
         
+        # Show anything drawn since the last move, such as a skipped turn
+        window.update()
+
         # Reactivate clicks
         window.onclick(self.play)
     
+    ## SIGNATURE
+    # find_clicked_square :: (Object, Number, Number) => Integer
+    def find_clicked_square(self, x, y):
+        '''
+        Finds the square containing a mouse click directly from the click's 
+        position on the grid, instead of asking every square. As with 
+        Square.was_clicked, a click on a line between squares does not count.
+        int x -- The mouse x position
+        int y -- The mouse y position 
+        Returns the integer location of the square, or -1 if the click was 
+            not inside a square on the board.
+        '''
+        column, x_offset = divmod(x - self._corner, SQUARE)
+        row, y_offset = divmod(y - self._corner, SQUARE)
+
+        # On a line or off the board:
+        if x_offset == 0 or y_offset == 0:
+            return -1
+        if not (0 <= column < self.n and 0 <= row < self.n):
+            return -1
+
+        return int(row) * self.n + int(column)
+
     ## SIGNATURE
     # computer_move :: Object => Boolean
     def computer_move(self):
@@ -153,16 +276,9 @@ class GameBoard:
         It returns an integer representing the location of a square, or -1 if
         no valid move exists.
         '''
-        keys = self.valid_moves.keys()
-
-        key = -1
-        length = 0
-        for k in keys:
-            l = len(self.valid_moves[k])
-            if l > length:
-                length = l
-                key = k
-        return key
+        # The first move with the largest number of captured tiles wins ties
+        moves = self.valid_moves
+        return max(moves, key=lambda k: moves[k].bit_count(), default=-1)
 
     ## SIGNATURE
     # make_move :: (Object, Integer) => Void
@@ -171,22 +287,29 @@ class GameBoard:
         Executes the actions necessary to make a move after a choice of tile
         location has been made.
         int location -- The index location of the square where the tile 
-            will go.
+            will go. Must be a key of self.valid_moves.
         '''
-        assert type(location) == int and 0 <= location < self.n**2, \
-            "location must be a valid board index"
+        # Looking up the captures first doubles as validation: a location
+        # that is not a valid move raises KeyError before anything is drawn.
+        to_flip = self.valid_moves[location]
 
-        # Put a tile in the square
-        self.place(location)
+        try:
+            # Put a tile in the square
+            self._place(location, self.turn)
 
-        # Flip captured tiles
-        to_flip = self.valid_moves[location]
-        self.flip_tiles(to_flip)
+            # Flip captured tiles
+            self.flip_tiles(to_flip)
 
-        # Determine valid moves for next player
-        self.switch_turns()
-        self.valid_moves = self.find_valid_moves()
-        self.announce_turn()
+            # Determine valid moves for next player
+            self.switch_turns()
+            self.valid_moves = self.find_valid_moves()
+            if window is not None:
+                self.announce_turn()
+
+        # Repaint the whole move at once
+        finally:
+            if window is not None:
+                window.update()
     
     ## SIGNATURE
     # place :: (Object, Integer) => Void
@@ -198,41 +321,77 @@ class GameBoard:
         int location -- An index representing a square on the board, 0 to (n*n)-1.
         '''
         assert type(location) == int, "location must be an integer"
-        assert 0 <= location < self.n**2, \
+        assert 0 <= location < self._nn, \
             "location must be within the size of the board"
 
+        self._place(location, self.turn)
+
+    ## SIGNATURE
+    # _place :: (Object, Integer, Integer) => Void
+    def _place(self, location, color):
+        '''
+        Does the work of place without validating location. Used by
+        make_move, whose location has already been checked against
+        self.valid_moves, and to place the starting tiles.
+        int location -- An index representing a square on the board, 0 to (n*n)-1.
+        int color -- The color number of the new tile, BLACK or WHITE.
+        '''
         # Get center coordinates of the square
-        x, y = self.squares[location].calc_center()
+        x, y = self._sq_cx[location], self._sq_cy[location]
 
         # Draw a new tile in the square
-        piece = GamePiece(location, self.turn, x, y)
+        piece = GamePiece(location, COLOR_NAMES[color], x, y)
         piece.draw_tile()
 
         # Track the new tile
         self.pieces[location] = piece
-        if self.turn == "white":
+        self._bb[color] |= 1 << location
+        self._hash ^= self._zobrist[color][location]
+        if color == WHITE:
             self.white += 1
-        elif self.turn == "black":
+        else:
             self.black += 1
 
     ## SIGNATURE
-    # find_valid_moves :: Object => {Integer: Integer[]}
+    # find_valid_moves :: Object => {Integer: Integer}
     def find_valid_moves(self):
         '''
         Determines which squares are valid moves based on the current state of 
         the game and which tiles can be captured from each square.
+        Returns a dictionary of square locations to bitboards of the tiles 
+            captured by a move there.
         '''
-        moves = {}
-        for square in self.squares:
-            # Find the tiles that could be flipped from there
-            can_capture = self.all_can_capture(square.location)
+        # The key describes the whole game state, so cached moves never go stale
+        key = (self.turn, self._hash)
+        if key in self._moves_cache:
+            self._moves_cache.move_to_end(key)
+            return self._moves_cache[key]
+
+        own, opp = self.own_and_opponent()
+        moves, captures = self.find_valid_moves_bb(own, opp)
 
-            # The list is not empty:
-            if can_capture:
-                # Add list of tiles to dictionary
-                moves[square.location] = can_capture
+        # Remember the moves, forgetting the least recently used position
+        # once the cache is full.
+        self._moves_cache[key] = captures
+        if len(self._moves_cache) > MOVES_CACHE_SIZE:
+            self._moves_cache.popitem(last=False)
 
-        return moves
+        return captures
+
+    ## SIGNATURE
+    # find_valid_moves_bb :: (Object, Integer, Integer) => (Integer, {Integer: Integer})
+    def find_valid_moves_bb(self, own, opp):
+        '''
+        Finds every valid move for a player at once using bitboards. For each
+        direction, a line of opponent tiles is grown out from all of the 
+        player's tiles together (a "Dumb7Fill"), and any empty square just past
+        the end of a line is a valid move.
+        int own -- The bitboard of the player making a move.
+        int opp -- The bitboard of their opponent.
+        Returns a bitboard of the valid moves and a dictionary of square
+            locations to bitboards of the tiles captured by a move there.
+        '''
+        return generate_moves(own, opp, self.n, self.shifts, self.rays)
 
     ## SIGNATURE
     # all_can_capture :: (Object, Integer) => Integer[]
@@ -242,25 +401,24 @@ class GameBoard:
         int location -- An integer identifying a square on the board.
         Returns a list of integer index locations.
         '''
-        assert type(location) == int and 0 <= location < self.n**2, \
+        assert type(location) == int and 0 <= location < self._nn, \
             "location must be a valid board index"
 
-        square = self.squares[location]
-
         # The square is not empty:
-        if not square.is_empty(self.pieces):
+        if ((self._bb[BLACK] | self._bb[WHITE]) >> location) & 1:
             # Return an empty list, not a valid move.
             return []
 
         # The square is empty:
         else:
             captured = []
+            own, opp = self.own_and_opponent()
 
             # Check in each direction around the square
-            for direction in ("n", "ne", "e", "se", "s", "sw", "w", "nw"):
+            for d in range(8):
 
                 # Find the locations of tiles that can be captured
-                captured_in_direction = self.can_capture_in_direction(location, direction)
+                captured_in_direction = self._capture_line(location, d, own, opp)
                 # Add them to the total captured
                 captured += captured_in_direction
             
@@ -276,58 +434,212 @@ class GameBoard:
             n, ne, e, se, s, sw, w, nw
         Returns a list of integer index locations.
         '''
-        assert type(location) == int and 0 <= location < self.n**2,\
+        assert type(location) == int and 0 <= location < self._nn,\
             "location must be a valid board index"
-        assert direction in ("n", "ne", "e", "se", "s", "sw", "w", "nw"),\
+        assert direction in DIRECTIONS,\
             "direction must be one of n, ne, e, se, s, sw, w, nw"
 
-        captured = []
-
-        # Set an increment based on direction
-        # inc can be negative or positive
-        inc = self.set_increment(direction)
+        own, opp = self.own_and_opponent()
+        return self._capture_line(location, DIRECTION_NUMBERS[direction], own, opp)
 
-        # Set a max/min value to bound movement
-        end = self.set_max_min(location, direction)
+    ## SIGNATURE
+    # _capture_line :: (Object, Integer, Integer, Integer, Integer) => Integer[]
+    def _capture_line(self, location, d, own, opp):
+        '''
+        Finds tiles that can be captured from the given location in one direction, 
+        reading the precomputed direction tables instead of recalculating the
+        increment and bounds.
+        int location -- An integer identifying a square on the board.
+        int d -- The index of the direction in DIRECTIONS.
+        int own -- The bitboard of the player making a move.
+        int opp -- The bitboard of their opponent.
+        Returns a list of integer index locations.
+        '''
+        captured = []
+        inc = self._dir_incs[d]
 
-        # Ensure the stop in range includes end
-        if inc <= 0:
-            end -= 1
-        else:
-            end += 1
+        # While the next location is not past the edge of the board
+        for loc in range(location + inc, self._dir_end[location * 8 + d], inc):
+            bit = 1 << loc
 
-        # Get first potential opponent location
-        start = location + inc
+            # The next location has an opponent's tile:
+            if opp & bit:
+                captured.append(loc)
 
-        # While the next location is not above/below max/min
-        for loc in range(start, end, inc):
-            piece = self.pieces[loc]
+            # The next location has own tile, the line is closed:
+            elif own & bit:
+                return captured
 
-            # There isn't a piece there:
-            if piece == None:
+            # There isn't a tile there:
+            else:
                 # Return empty list because nothing can be captured 
                 return []
+        
+        # The loop reached the end of the board and only encountered 
+        # opponent tiles, so none of them can be captured.
+        return []
 
-            # The next location has an opponent's tile:
-            elif piece.color != self.turn:
-                captured.append(piece)
+    ## SIGNATURE
+    # own_and_opponent :: Object => (Integer, Integer)
+    def own_and_opponent(self):
+        '''
+        Finds the bitboards of the player whose turn it is and of their opponent.
+        Returns a tuple of two integers, the current player's bitboard first.
+        '''
+        return self._bb[self.turn], self._bb[self.turn ^ 1]
 
-            # The next location has own tile:
-            elif piece.color == self.turn:
-                captured.append(piece)
-                break
+    ## SIGNATURE
+    # init_shifts :: Object => (Integer, Integer, Integer)[]
+    def init_shifts(self):
+        '''
+        Determines how to move every tile on a bitboard one square in each 
+        direction at once. A tile moves with a left or right bit shift by the 
+        direction's increment, then a mask removes tiles that wrapped around to
+        the other side of the board or went past its top.
+        Returns a tuple of (left shift, right shift, mask) tuples, one for 
+            each of n, ne, e, se, s, sw, w, nw in that order.
+        '''
+        full = self._full_mask
 
-            loc += inc
-        
-        # The loop can append opponent tiles that can't be captured it it
-        # reaches the end of the board and only encountered opponent tiles.
-        # A final test is needed to ensure the last tile belongs to the 
-        # current player
-        if len(captured) > 0 and captured[-1].color == self.turn:
-            # remove own tile as a captured tile before returning
-            return captured[:-1]
-        else:
-            return []
+        # Bitboards of the first (left) and last (right) columns
+        first_column = 0
+        for row in range(self.n):
+            first_column |= 1 << (row * self.n)
+        last_column = first_column << (self.n - 1)
+
+        shifts = []
+        for direction, inc in zip(DIRECTIONS, self._dir_incs):
+            # Moving right, wrapped tiles land in the first column
+            if direction in ("ne", "e", "se"):
+                mask = full ^ first_column
+            # Moving left, wrapped tiles land in the last column
+            elif direction in ("nw", "w", "sw"):
+                mask = full ^ last_column
+            else:
+                mask = full
+
+            if inc > 0:
+                shifts.append((inc, 0, mask))
+            else:
+                shifts.append((0, -inc, mask))
+
+        return tuple(shifts)
+
+    ## SIGNATURE
+    # init_direction_tables :: Object => (Integer[], Integer[])
+    def init_direction_tables(self):
+        '''
+        Precomputes the increment of each direction and, for every square, the 
+        index just past the last square on the board in each direction, so 
+        walking a line needs no string compares or arithmetic. set_increment
+        and set_max_min look their answers up in these tables.
+        Returns a tuple of the 8 increments in DIRECTIONS order and an array 
+            where entry location * 8 + d is the stop value of a range walking
+            from location in direction d.
+        '''
+        n = self.n
+
+        # Sample board layout (self.n = 2):
+        # +---+---+
+        # | 2 | 3 |
+        # +---+---+
+        # | 0 | 1 |
+        # +---+---+
+        #       n,  ne,    e, se,      s,  sw,       w,  nw
+        incs = (n, n + 1, 1, -(n - 1), -n, -(n + 1), -1, n - 1)
+
+        ends = array("i")
+        for location in range(self._nn):
+            for d, direction in enumerate(DIRECTIONS):
+                # Ensure the stop in range includes the last square
+                if incs[d] <= 0:
+                    ends.append(self.find_max_min(location, direction) - 1)
+                else:
+                    ends.append(self.find_max_min(location, direction) + 1)
+
+        return incs, ends
+
+    ## SIGNATURE
+    # init_rays :: Object => (Integer[])[]
+    def init_rays(self):
+        '''
+        Precomputes a bitboard of every square on the board in a straight 
+        line out from each square, one for each direction. Uses the 
+        direction tables, so init_direction_tables must run first.
+        Returns a list where entry location is a tuple of 8 bitboards in 
+            DIRECTIONS order.
+        '''
+        rays = []
+        for location in range(self._nn):
+            masks = []
+            for d in range(8):
+                inc = self._dir_incs[d]
+                mask = 0
+                for loc in range(location + inc, self._dir_end[location * 8 + d], inc):
+                    mask |= 1 << loc
+                masks.append(mask)
+            rays.append(tuple(masks))
+
+        return rays
+
+    ## SIGNATURE
+    # init_zobrist :: Object => (Integer[])[]
+    def init_zobrist(self):
+        '''
+        Creates the random numbers for Zobrist hashing the board. Each 
+        (color, location) pair gets a 64 bit number, and a board's hash is 
+        the XOR of the numbers for every tile on it. Placing or flipping a 
+        tile then only XORs one or two numbers into the hash. A fixed seed 
+        keeps hashes the same from game to game.
+        Returns a list of two lists of n*n integers, indexed by color number.
+        '''
+        rng = random.Random(0xC0FFEE)
+        return [[rng.getrandbits(64) for location in range(self._nn)] 
+                for color in range(2)]
+
+    ## SIGNATURE
+    # zobrist_hash :: Object => Integer
+    def zobrist_hash(self):
+        '''
+        Calculates the Zobrist hash of the board from scratch. During a game 
+        the hash is kept up to date incrementally by place and flip_tile.
+        Returns an integer.
+        '''
+        h = 0
+        for color in (BLACK, WHITE):
+            for location in bit_locations(self._bb[color]):
+                h ^= self._zobrist[color][location]
+        return h
+
+    ## SIGNATURE
+    # black_bb :: Object => Integer
+    @property
+    def black_bb(self):
+        '''
+        The bitboard of black tiles, bit i is square i. Setting it directly 
+        recalculates the board's hash.
+        '''
+        return self._bb[BLACK]
+
+    @black_bb.setter
+    def black_bb(self, bb):
+        self._bb[BLACK] = bb
+        self._hash = self.zobrist_hash()
+
+    ## SIGNATURE
+    # white_bb :: Object => Integer
+    @property
+    def white_bb(self):
+        '''
+        The bitboard of white tiles, bit i is square i. Setting it directly 
+        recalculates the board's hash.
+        '''
+        return self._bb[WHITE]
+
+    @white_bb.setter
+    def white_bb(self, bb):
+        self._bb[WHITE] = bb
+        self._hash = self.zobrist_hash()
 
     ## SIGNATURE
     # set_increment :: (Object, String) => Integer
@@ -339,55 +651,49 @@ class GameBoard:
             n, ne, e, se, s, sw, w, nw
         Returns an integer
         '''
-        assert direction in ("n", "ne", "e", "se", "s", "sw", "w", "nw"), \
+        assert direction in DIRECTIONS, \
             "direction must be one of n, ne, e, se, s, sw, w, nw"
 
-        # Sample board layout (self.n = 2):
-        # +---+---+
-        # | 2 | 3 |
-        # +---+---+
-        # | 0 | 1 |
-        # +---+---+
-        if direction == "n":
-            inc = self.n
-        elif direction == "s":
-            inc = -self.n
-        elif direction == "e":
-            inc = 1
-        elif direction == "w":
-            inc = -1
-        elif direction == "ne":
-            inc = self.n + 1
-        elif direction == "nw":
-            inc = self.n - 1
-        elif direction == "se":
-            inc = -(self.n - 1)
-        elif direction == "sw":
-            inc = -(self.n + 1)
-
-        return inc
+        return self._dir_incs[DIRECTION_NUMBERS[direction]]
 
     ## SIGNATURE
-    # set_max_min :: (Object, Integer, String) => (String, Integer)
+    # set_max_min :: (Object, Integer, String) => Integer
     def set_max_min(self, location, direction):
         '''
         For the given location, determines the maximum or minimum index 
         location along the given direction that is still on the board.       
         int location -- An integer identifying a square on the board.
+        str direction -- The direction to look in. Can be one of:
+            n, ne, e, se, s, sw, w, nw
         Returns the min or max square location along direction that is 
             still on the board.
         '''
-        assert type(location) == int and 0 <= location < self.n**2,\
+        assert type(location) == int and 0 <= location < self._nn,\
             "location must be a valid board index"
-        assert direction in ("n", "ne", "e", "se", "s", "sw", "w", "nw"),\
+        assert direction in DIRECTIONS,\
             "direction must be one of n, ne, e, se, s, sw, w, nw"
 
-        row_num = location // self.n    # from 0 to self.n-1
-        row_start = row_num * self.n    # first index in row
-        max_steps = self.n - 1          # squares from first-in-row to last-in-row
-        row_end = row_start + max_steps # last index in row
-        board_max = self.n**2 - 1       # maximum index on board
-        board_min = 0                   # lowest index on board
+        # The direction tables hold one step past the answer
+        d = DIRECTION_NUMBERS[direction]
+        if self._dir_incs[d] <= 0:
+            return self._dir_end[location * 8 + d] + 1
+        return self._dir_end[location * 8 + d] - 1
+
+    ## SIGNATURE
+    # find_max_min :: (Object, Integer, String) => Integer
+    def find_max_min(self, location, direction):
+        '''
+        Calculates the answer to set_max_min without validation or the 
+        direction tables. Used by init_direction_tables to build them.
+        int location -- An integer identifying a square on the board.
+        str direction -- The direction to look in.
+        Returns the min or max square location along direction that is 
+            still on the board.
+        '''
+        row_start = self._row_start[location]   # first index in row
+        row_end = self._row_end[location]       # last index in row
+        board_max = self._nn - 1                # maximum index on board
+        board_min = 0                           # lowest index on board
 
         # Instead of using a single variable for all conditions I've 
         # used two, a max and min, because it helps make clear
@@ -420,7 +726,7 @@ class GameBoard:
             # edge is also the number of steps to take up from the edge.
             # For some squares, the limit needs to be before the last, 
             # upper-right square.
-            steps = max_steps - (location % self.n)
+            steps = row_end - location
             mx = row_end + (steps * self.n)
 
             # For others, this is over the max board index
@@ -430,7 +736,7 @@ class GameBoard:
         # Moving down-right
         elif direction == "se":
             # Same logic as northeast, but downwards
-            steps = max_steps - (location % self.n)
+            steps = row_end - location
             mn = row_end - (steps * self.n)
             if mn < board_min:
                 mn = board_min
@@ -457,14 +763,32 @@ class GameBoard:
             return mx
 
     ## SIGNATURE
-    # flip_tiles :: (Object, Integer[]) => Void
-    def flip_tiles(self, tile_list):
-        '''
-        Drives the flipping of opponent tiles after a move is made.
-        int[] tile_list -- A list of all the locations of tiles to be flipped.
-        '''
-        for tile in tile_list:
-            self.flip_tile(tile.location)
+    # flip_tiles :: (Object, Integer) => Void
+    def flip_tiles(self, flips):
+        '''
+        Drives the flipping of opponent tiles after a move is made, turning 
+        them to the current player's color. The bitboards and tile counts 
+        are updated for every tile at once; only the hash and the drawing 
+        need each tile. Each drawn tile is one canvas recolor, and they are 
+        all shown together by the single window.update() in make_move.
+        int flips -- A bitboard of the tiles to be flipped.
+        '''
+        # Every flipped tile changes color, whichever color it was
+        self._bb[BLACK] ^= flips
+        self._bb[WHITE] ^= flips
+
+        flipped = flips.bit_count()
+        if self.turn == WHITE:
+            self.white += flipped
+            self.black -= flipped
+        else:
+            self.black += flipped
+            self.white -= flipped
+
+        black_z, white_z = self._zobrist
+        for location in bit_locations(flips):
+            self._hash ^= black_z[location] ^ white_z[location]
+            self.pieces[location].flip()
 
     ## SIGNATURE
     # flip_tile :: (Object, Integer) = > Void
@@ -474,23 +798,26 @@ class GameBoard:
         tracks resulting changes to the board state.
         int location -- The location of the tile to be flipped.
         '''
-        assert type(location) == int and 0 <= location < self.n**2,\
+        assert type(location) == int and 0 <= location < self._nn,\
             "location must be a valid board index"
 
         piece = self.pieces[location]
-        square = self.squares[location]
+        bit = 1 << location
 
         # The square in location is not empty:
-        if not square.is_empty(self.pieces):
-            # Change the color of the piece
+        if (self._bb[BLACK] | self._bb[WHITE]) & bit:
+            # Change the color of the piece, XORing the old color out of the
+            # hash and the new one in.
             piece.flip()
+            self._bb[BLACK] ^= bit
+            self._bb[WHITE] ^= bit
+            self._hash ^= self._zobrist[BLACK][location] ^ self._zobrist[WHITE][location]
 
         # Increment/decrement self.black & self.white as needed.
-        color = piece.color
-        if color == "white":
+        if self._bb[WHITE] & bit:
             self.white += 1
             self.black -= 1
-        elif color == "black":
+        elif self._bb[BLACK] & bit:
             self.black += 1
             self.white -= 1
 
@@ -500,10 +827,7 @@ class GameBoard:
         '''
         Changes the turn from black to white or white to black.
         '''
-        if self.turn == "white":
-            self.turn = "black"
-        elif self.turn == "black":
-            self.turn = "white"
+        self.turn ^= 1
     
     ## SIGNATURE
     # is_full :: Object => Boolean
@@ -512,13 +836,8 @@ class GameBoard:
         Tests whether the board is full of tiles or not.
         Returns a boolean value.
         '''
-        full = True
-        for tile in self.pieces:
-            # If any tile is None, the board is not full
-            if tile == None:
-                full = False
-                break
-        return full
+        # Every square has a bit set in one of the two bitboards
+        return (self._bb[BLACK] | self._bb[WHITE]) == self._full_mask
     
     ## SIGNATURE
     # find_winner :: Object => (String, String)
@@ -548,71 +867,79 @@ class GameBoard:
         Announces a winner and saves user's name in a high scores file.
         '''
         self.announce_winner()
+        window.update()
 
         # Make a pop up window to collect user's name
         name = window.textinput("Name", "Enter your name to save your score:")
 
         # Only save name if the user gives one:
         if name != "" and name != None:
-            self.save_score(name, SCORES)
+            self.save_score(name, SCORES, HIGH_SCORES)
     
     ## SIGNATURE
-    # save_score :: (Object, String, String) => Void
-    def save_score(self, name, path):
+    # save_score :: (Object, String, String, String) => Void
+    def save_score(self, name, path, top_path):
         '''
-        Save the user's score to a text file with the given path. The 
-        highest score is saved at the top of the file; the rest is
-        ordered as played.
+        Save the user's score. Every score is appended to a log file, which is
+        never read back, and the best HIGH_SCORES_SIZE scores are kept in a 
+        separate small file, highest first. Only the small file is rewritten, 
+        so saving does not get slower as the log grows.
         str name -- A name given by the user.
-        str path -- A path to the scores file.
+        str path -- A path to the scores log file.
+        str top_path -- A path to the high scores file.
         '''
         assert type(name) == str, "name must be a string"
         assert type(path) == str, "path must be a string"
+        assert type(top_path) == str, "top_path must be a string"
 
-        try:
-            scores = open(path, "r+")
+        entry = name + " " + str(self.black) + "\n"
 
-            # Read first line and make a list of [<name>, <score>]
-            # This will be the current high score
-            high_score = scores.readline().strip().split()
+        # Append to the log, creating it if needed
+        scores = open(path, "a")
+        scores.write(entry)
+        scores.close()
 
-            # Write any new high scores at the top of the file:
-            if self.black > int(high_score[1]):
+        # Read the current high scores as [<name>, <score>] pairs
+        try:
+            top = open(top_path, "r")
+            high_scores = [line.rsplit(None, 1) for line in top if line.strip()]
+            top.close()
+        # If the file doesn't exist, there are no high scores yet
+        except FileNotFoundError:
+            high_scores = []
 
-                # Reset position to beginning and read whole file.
-                scores.seek(0, 0)
-                rest = scores.read()
+        # Insert after any equal scores so earlier games keep their place
+        index = 0
+        while index < len(high_scores) and int(high_scores[index][1]) >= self.black:
+            index += 1
 
-                # Reset position again and write scores
-                scores.seek(0, 0)
-                scores.write(name + " " + str(self.black) + "\n")
-                scores.write(rest)
+        # Not a high score, nothing to rewrite:
+        if index >= HIGH_SCORES_SIZE:
+            return
 
-            # Not a new high score:
-            else:
-                scores.write(name + " " + str(self.black) + "\n")
-            
-            scores.close()
-        
-        # If the file doesn't exist, create a new one and make the first entry
-        except FileNotFoundError:
-            scores = open(path, "w")
-            scores.write(name + " " + str(self.black) + "\n")
-            scores.close()
+        high_scores.insert(index, [name, str(self.black)])
+
+        top = open(top_path, "w")
+        for high_name, high_score in high_scores[:HIGH_SCORES_SIZE]:
+            top.write(high_name + " " + high_score + "\n")
+        top.close()
 
     ## SIGNATURE
-    # init_squares :: (Object, Integer) => Object
+    # init_squares :: (Object, Integer) => (Integer[], Integer[], Integer[], Integer[])
     def init_squares(self, corner):
         '''
-        Populates the self.squares list.
+        Builds the coordinates of every square on the board as parallel arrays
+        indexed by square location, rather than one Square object per square.
         int corner -- A number representing the x & y coordinate of the 
             first square.
-        Returns a list of Square objects
+        Returns a tuple of four integer arrays: the lower left x & y 
+            coordinates and the center x & y coordinates of each square.
         '''
         assert type(corner) == int, "corner must be an integer"
 
-        lst = []
-        index = 0
+        xs = array("i")
+        ys = array("i")
+        half = SQUARE // 2
 
         # y-coordinates can continuously increase
         y_corner = corner
@@ -622,29 +949,35 @@ class GameBoard:
             x_corner = corner
             for column in range(self.n):
 
-                # Add a square to the tracker list and increment values
-                lst.append(Square(index, x_corner, y_corner))
-                index += 1
+                # Add a square to the arrays and increment values
+                xs.append(x_corner)
+                ys.append(y_corner)
                 x_corner += SQUARE
 
             y_corner += SQUARE
+
+        # Same as Square.calc_center
+        cxs = array("i", (x + SQUARE - half for x in xs))
+        cys = array("i", (y + SQUARE - half for y in ys))
         
-        return lst
+        return xs, ys, cxs, cys
     
     ## SIGNATURE
-    # find_center_squares :: Object => Integer[]
-    def find_center_squares(self):
+    # init_center_squares :: Object => Integer[]
+    def init_center_squares(self):
         '''
-        Finds the four center starting squares on the board.
+        Calculates the four center starting squares on the board. Used once
+        by __init__, see find_center_squares.
         Returns a tuple of ints representing the indexes of the four center 
             squares on the draw_board.
         '''
         # If n is even and the board grid is indexed from 0 to n*n,
         # then the upper right center square can be found with the formula:
-        # 0.5(n**2 + n)
+        # (n**2 + n) // 2
+        # n**2 + n = n(n + 1) is always even, so integer division is exact.
         # The remaining squares can be found by subtracting from that result
         # 1, n, n+1 for upper left, lower right, and lower left respectively
-        ur = int(0.5 * (self.n**2 + self.n))
+        ur = (self._nn + self.n) // 2
         ul = ur - 1
         lr = ur - self.n
         ll = lr - 1
@@ -652,6 +985,16 @@ class GameBoard:
         # see draw_start_tiles.
         return (ul, ur, lr, ll)
 
+    ## SIGNATURE
+    # find_center_squares :: Object => Integer[]
+    def find_center_squares(self):
+        '''
+        Finds the four center starting squares on the board.
+        Returns a tuple of ints representing the indexes of the four center 
+            squares on the draw_board.
+        '''
+        return self._center_sqs
+
     ## SIGNATURE
     # draw_board :: Object => Void
     def draw_board(self):
@@ -677,9 +1020,9 @@ class GameBoard:
         othello.setposition(corner, corner)
 
         # Draw the green background
+        othello.pendown()
         othello.begin_fill()
         for i in range(4):
-            othello.pendown()
             othello.forward(SQUARE * self.n)
             othello.left(90)
         othello.end_fill()
@@ -712,9 +1055,8 @@ class GameBoard:
         Draws the four starting tiles on the board.
         '''
         start_tiles = self.find_center_squares()
-        for location in start_tiles:
-            self.place(location)
-            self.switch_turns()
+        for location, color in zip(start_tiles, START_COLORS):
+            self._place(location, color)
 
     ## SIGNATURE
     # draw_box :: Object => Void
@@ -759,14 +1101,12 @@ class GameBoard:
         othello.penup()
         othello.home()
         othello.color("white")
-        othello.pendown()
         othello.write(message, align="center", font=("Georgia", 25, "bold", "underline"))
         print(message)
 
         # Display score
         othello.penup()
         othello.goto(0, -SQUARE//2)
-        othello.pendown()
         othello.write(score, align="center", font=("Georgia", 16, "bold"))
         print(score)
 
@@ -776,7 +1116,7 @@ class GameBoard:
         '''
         Displays whose turn it is at the top of the board.
         '''
-        message = self.turn + "'s turn"
+        message = COLOR_NAMES[self.turn] + "'s turn"
 
         ## Draw white box around old text
         # Setup
@@ -798,7 +1138,6 @@ class GameBoard:
         othello.penup()
         othello.goto(0, self.size // 2)    # Middle-top of the board
         othello.color("black")
-        othello.pendown()
         othello.write(message, align="center", font=("Georgia"))
 
 
@@ -807,6 +1146,7 @@ class Square:
     '''
     Represents a single square on the Othello board.
     '''
+    __slots__ = ("location", "x", "y", "size", "center")
 
     def __init__(self, location, x, y):
         '''
@@ -817,9 +1157,9 @@ class Square:
         Attributes representing the length of a side (size) and the center
             coordinates (center) of the square are also initialized.
         '''
-        assert type(location) == int and location >= 0, \
+        assert type(location) is int and location >= 0, \
             "location must be a non-negative integer"
-        assert type(x) == int and type(y) == int, \
+        assert type(x) is int and type(y) is int, \
             "x & y must be integers"
         
         self.location = location
@@ -858,23 +1198,23 @@ class Square:
         return inside
 
     ## SIGNATURE
-    # is_empty :: Object => Boolean
-    def is_empty(self, state):
+    # is_empty :: (Object, Integer) => Boolean
+    def is_empty(self, occupied):
         '''
         Tests if the square contains a tile
-        GamePiece[] state -- A list of GamePiece objects representing the 
-            current board layout.
+        int occupied -- A bitboard of every tile on the board, the union of 
+            the black and white bitboards.
         Returns a boolean value.
         '''
-        if state[self.location] == None:
-            return True
-        return False
+        return not (occupied >> self.location) & 1
 
 
 class GamePiece:
     '''
     GamePiece represents a single piece, or tile, in Othello.
     '''
+    __slots__ = ("location", "color", "x", "y", "item")
+    _FLIP = {"black": "white", "white": "black"}    # color => opposite color
 
     def __init__(self, location, color, center_x, center_y):
         '''
@@ -883,29 +1223,48 @@ class GamePiece:
         int center_x -- The x-coordinate of the piece's center.
         int center_y -- The y-coordinate of the piece's center.
         '''
-        assert type(location) == int and location >= 0,\
+        assert type(location) is int and location >= 0,\
             "location must be a non-negative integer"
         assert color == "black" or color == "white",\
             "color must be 'black' or 'white'"
-        assert type(center_x) == int and type(center_y) == int,\
+        assert type(center_x) is int and type(center_y) is int,\
             "x & y values must be integers"
 
         self.location = location
         self.color = color
         self.x = center_x
         self.y = center_y
+        self.item = None    # Canvas item id, set when first drawn
 
     ## SIGNATURE
-    # draw_tile :: Object => Void
-    def draw_tile(self):
-        '''
-        Draws an Othello piece on the game board using the global Turtle object.
-        str color -- The color of the piece being placed.
-        '''
-        othello.penup()
-        othello.goto(self.x, self.y)
-        othello.pendown()
-        othello.dot(DIAMETER, self.color)
+    # draw_tile :: (Object, Canvas) => Void
+    def draw_tile(self, canvas=None):
+        '''
+        Draws an Othello piece on the game board, or recolors it if it has 
+        already been drawn. Nothing is shown until the screen is next 
+        updated, so a caller drawing many pieces with the tracer off gets a 
+        single repaint.
+        Canvas canvas -- The Tk canvas to draw on. Defaults to the window's.
+        '''
+        if canvas is None:
+            canvas = window_canvas
+
+            # No display, nothing to draw on
+            if canvas is None:
+                return
+
+        # Draw straight onto the Tk canvas. A turtle dot is a zero length 
+        # line that goes through the turtle's pen state and undo buffer, an
+        # oval is a single canvas item. Canvas y runs down, turtle y runs up.
+        if self.item is None:
+            x, y = self.x, -self.y
+            self.item = canvas.create_oval(
+                x - RADIUS, y - RADIUS, x + RADIUS, y + RADIUS,
+                fill=self.color, outline=self.color)
+
+        # Recolor the existing item rather than stacking a new one on it
+        else:
+            canvas.itemconfig(self.item, fill=self.color, outline=self.color)
 
     ## SIGNATURE
     # change_color :: Object => Void
@@ -914,20 +1273,27 @@ class GamePiece:
         Changes the object's color from black to white, or 
         from white to black.
         '''
-        if self.color == "white": 
-            self.color = "black"
-        elif self.color == "black":
-            self.color = "white"
+        self.color = GamePiece._FLIP[self.color]
 
     ## SIGNATURE
-    # flip :: Object => Void
+    # flip :: (Object, Canvas) => Void
     # This method not used in part 1 and not in testing.txt
-    def flip(self):
+    def flip(self, canvas=None):
         '''
-        Redraws a tile with a new color.
+        Changes the tile's color and recolors its canvas item in place. Does
+        the work of change_color and draw_tile in one step, as this runs for
+        every captured tile.
+        Canvas canvas -- The Tk canvas the tile was drawn on. Defaults to 
+            the window's.
         '''
-        self.change_color()
-        self.draw_tile()
+        color = GamePiece._FLIP[self.color]
+        self.color = color
+
+        # Tiles that were never drawn have nothing to recolor
+        if self.item is not None:
+            if canvas is None:
+                canvas = window_canvas
+            canvas.itemconfig(self.item, fill=color, outline=color)
 
     ## SIGNATURE
     # __repr__ :: Object => String
@@ -935,10 +1301,114 @@ class GamePiece:
         '''
         A string representation of this object. Made to help in debugging.
         '''
-        return self.color + " @ " + str(self.location)
+        return f"{self.color} @ {self.location}"
+
+
+#### Functions ####
+
+## SIGNATURE
+# init_graphics :: Void => Void
+def init_graphics():
+    '''
+    Opens the graphics window and sets the graphics globals. turtle, and with
+    it Tk, is only imported here, so the rest of the module can be used 
+    without a display. Must be called before a GameBoard is made for the
+    board to be drawn and played with the mouse.
+    '''
+    global turtle, window, othello, window_canvas
+    import turtle
+
+    window = turtle.Screen()
+    othello = turtle.Turtle()
+    window_canvas = window.getcanvas()
+
+
+## SIGNATURE
+# bit_locations :: Integer => Integer[]
+def bit_locations(bb):
+    '''
+    Finds the locations of the tiles on a bitboard.
+    int bb -- A bitboard, where bit i is set if square i has a tile.
+    Returns a list of integer index locations, lowest first.
+    '''
+    locations = []
+    while bb:
+        # Isolate the lowest set bit and find its index
+        low = bb & -bb
+        locations.append(low.bit_length() - 1)
+        bb ^= low
+    return locations
+
+
+## SIGNATURE
+# generate_moves :: (Integer, Integer, Integer, (Integer, Integer, Integer)[], (Integer[])[]) => (Integer, {Integer: Integer})
+def generate_moves(own, opp, n, shifts, rays):
+    '''
+    The move generation kernel behind GameBoard.find_valid_moves_bb. It only 
+    works on integers and the precomputed shifts, so it needs no GameBoard
+    and does no attribute lookups while it runs.
+    int own -- The bitboard of the player making a move.
+    int opp -- The bitboard of their opponent.
+    int n -- The number of squares on one side of the board.
+    (int, int, int)[] shifts -- The shifts and masks from GameBoard.init_shifts.
+    (int[])[] rays -- The line bitboards from GameBoard.init_rays.
+    Returns a bitboard of the valid moves and a dictionary of square
+        locations to bitboards of the tiles captured by a move there.
+    '''
+    empty = ~(own | opp) & ((1 << (n * n)) - 1)
+
+    moves = 0
+    for left, right, mask in shifts:
+        # Opponent tiles touching one of our tiles in this direction
+        line = ((own << left >> right) & mask) & opp
+
+        # Nothing to grow, skip the direction
+        if not line:
+            continue
+
+        # A line holds at most n-2 opponent tiles, one is already found.
+        # Most lines are short, so stop as soon as a step adds nothing. This
+        # beats a Kogge-Stone fill, whose fixed log2(n) rounds of doubled 
+        # shifts cost more in Python than the one or two steps usually needed.
+        for step in range(n - 3):
+            grown = line | (((line << left >> right) & mask) & opp)
+            if grown == line:
+                break
+            line = grown
+
+        # Empty squares at the end of a line
+        moves |= ((line << left >> right) & mask) & empty
+
+    # Find what each move captures along the line out from it in each 
+    # direction. The first tile or empty square on the line that is not an
+    # opponent's decides: if it is our own tile, everything before it is
+    # captured. Lines in left shift directions run up from the move, so the 
+    # first blocker is the lowest bit; the others run down and it is the
+    # highest bit.
+    captures = {}
+    for location in bit_locations(moves):
+        captured = 0
+        for (left, right, mask), line in zip(shifts, rays[location]):
+            blockers = line & ~opp
+            if left:
+                first = blockers & -blockers
+                between = line & (first - 1)
+            elif blockers:
+                first = 1 << (blockers.bit_length() - 1)
+                between = line & -(first << 1)
+            else:
+                continue
+
+            if first & own:
+                captured |= between
+
+        captures[location] = captured
+
+    return moves, captures
 
 
 #### Start Game ####
 if __name__ == "__main__":
-    board = GameBoard(8)
+    init_graphics()
+    board = GameBoard.from_user_input(8)
     turtle.done()
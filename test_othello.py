@@ -1,10 +1,7 @@
 '''
-This is a test module for the Othello program. It removes the automatic graphic
-components so unit testing is more easily accomplished.
-
-I recommend commenting out the global window and othello variables
-in othello.py before running tests in order to prevent a graphics window 
-from popping up.
+This is a test module for the Othello program. othello.py only opens a graphics
+window when it is run, so the boards tested here are real GameBoards that 
+draw nothing.
 
 Author: Evan Douglass
 '''
@@ -15,33 +12,49 @@ import othello as o
 SQUARE = 50             # pixels
 RADIUS = SQUARE - 10    # pixels
 
-class GameBoardTest(o.GameBoard):
-    '''Same as GameBoard but does not draw graphics when initialized.'''
-
-    def __init__(self, n):
-        '''
-        Sets up gameplay. The exact same implementation as the GameBoard class __init__
-        but without the graphic components.
-        int n -- The number of squares on one side of the board (it's length
-        in squares).
-        '''
-        assert type(n) == int, "n must be an integer."
-        assert n >= 4, "n must be greater than or equal to 4."
-        assert n % 2 != 1, "n must be even."
-        self.n = n
-
-        self.size = SQUARE * n
-        self.turn = "black"         # The user will go first and is assigned the black pieces
-
-        # Game state tracking attributes
-        self.pieces = [None for location in range(n*n)]
-        self.black = 0
-        self.white = 0
-        start = -n * SQUARE // 2     # The x & y coordinate of the first square
-        self.squares = self.init_squares(start)
-        self.valid_moves = self.find_valid_moves()
-
-        # Graphic components start here and are omitted
+# Assertion messages checked in more than one test
+DIRECTION_MSG = "direction must be one of n, ne, e, se, s, sw, w, nw"
+INDEX_MSG = "location must be a valid board index"
+
+
+def bitboard(*locations):
+    '''Builds a bitboard with a bit set for each of the given locations.'''
+    bb = 0
+    for location in locations:
+        bb |= 1 << location
+    return bb
+
+
+def ray_captures(board, own, opp, location):
+    '''
+    Finds the captures for own at location using only the board's ray masks 
+    and bit operations. A reference to check the board's own move search 
+    against. Returns a bitboard of the captured tiles.
+    '''
+    if ((own | opp) >> location) & 1:
+        return 0
+    captures = 0
+    for d, ray in enumerate(board.rays[location]):
+        ends = ray & own
+        if not ends:
+            continue
+        # The nearest own tile is the lowest bit on rays going up the board, 
+        # and the highest bit on rays going down it
+        if board._dir_incs[d] > 0:
+            end = (ends & -ends).bit_length() - 1
+        else:
+            end = ends.bit_length() - 1
+        # Everything on the ray before the end must be an opponent's tile
+        between = ray ^ board.rays[end][d] ^ (1 << end)
+        if between and between & opp == between:
+            captures |= between
+    return captures
+
+
+# A midgame 6x6 position, black to move
+SIX_BLACK = bitboard(0, 2, 4, 12, 17, 24, 32, 35)
+SIX_WHITE = bitboard(7, 8, 9, 13, 15, 16, 19, 20, 21, 26, 28)
+
 
 ########## GameBoard Class Tests ##########
 
@@ -53,81 +66,125 @@ def test_invalid_inits():
 
     # Test non-integer inputs
     with pt.raises(AssertionError) as string:
-        GameBoardTest("hello")
+        o.GameBoard.from_user_input("hello")
     with pt.raises(AssertionError) as lst:
-        GameBoardTest([1, 2, 3, 4])
+        o.GameBoard.from_user_input([1, 2, 3, 4])
     with pt.raises(AssertionError) as floating:
-        GameBoardTest(9.5)
+        o.GameBoard.from_user_input(9.5)
 
-    assert "n must be an integer." in str(string.value)
-    assert "n must be an integer." in str(lst.value)
-    assert "n must be an integer." in str(floating.value)
+    assert string.value.args[0] == "n must be an integer."
+    assert lst.value.args[0] == "n must be an integer."
+    assert floating.value.args[0] == "n must be an integer."
 
     # Test integers less than 4
     with pt.raises(AssertionError) as one:
         # Odd
-        GameBoardTest(1)
+        o.GameBoard.from_user_input(1)
     with pt.raises(AssertionError) as negative:
         # Negative
-        GameBoardTest(-45)
+        o.GameBoard.from_user_input(-45)
     with pt.raises(AssertionError) as two:
         # Even
-        GameBoardTest(2)
+        o.GameBoard.from_user_input(2)
 
-    assert "n must be greater than or equal to 4." in str(one.value)
-    assert "n must be greater than or equal to 4." in str(negative.value)
-    assert "n must be greater than or equal to 4." in str(two.value)
+    assert one.value.args[0] == "n must be greater than or equal to 4."
+    assert negative.value.args[0] == "n must be greater than or equal to 4."
+    assert two.value.args[0] == "n must be greater than or equal to 4."
 
     # Test odd integers greater than 4
     with pt.raises(AssertionError) as odd_9:
-        GameBoardTest(9)
+        o.GameBoard.from_user_input(9)
     with pt.raises(AssertionError) as odd_23:
-        GameBoardTest(23)
+        o.GameBoard.from_user_input(23)
+
+    assert odd_9.value.args[0] == "n must be even."
+    assert odd_23.value.args[0] == "n must be even."
+
+    # A valid size makes a board
+    assert o.GameBoard.from_user_input(4).n == 4
+
+
+# Valid inits, built once and shared by every test
+@pt.fixture(scope="session")
+def four():
+    return o.GameBoard(4)
+
+
+@pt.fixture(scope="session")
+def six_board():
+    '''The black and white bitboards of a 6x6 board at the start of a game.'''
+    return bitboard(15, 20), bitboard(14, 21)
+
+
+@pt.fixture
+def six(six_board):
+    # Ints are immutable, so each test gets its own board from the same pair
+    return o.GameBoard.from_bitboards(6, *six_board)
+
 
-    assert "n must be even." in str(odd_9.value)
-    assert "n must be even." in str(odd_23.value)
+@pt.fixture(scope="session")
+def eight():
+    return o.GameBoard(8)
 
 
-# Valid inits
-four = GameBoardTest(4)
-six = GameBoardTest(6)
-eight = GameBoardTest(8)
+@pt.fixture(autouse=True)
+def restore_boards(four, eight):
+    '''
+    Puts back the game state of each shared board after a test changes it, so 
+    tests do not need to clean up after themselves.
+    '''
+    saved = [(board, board.black_bb, board.white_bb, board.turn, board.black, 
+              board.white, board.valid_moves) for board in (four, eight)]
+    yield
+    for board, black_bb, white_bb, turn, black, white, valid_moves in saved:
+        if (board.black_bb, board.white_bb) != (black_bb, white_bb):
+            board.black_bb, board.white_bb = black_bb, white_bb
+        board.turn, board.black, board.white = turn, black, white
+        board.valid_moves = valid_moves
 
 
-def test_init():
+def test_init(four, six, eight):
     # Test for correct attribute assignments
-    # Note that squares list tests are in test_init_squares
+    # Note that square coordinate tests are in test_init_squares
 
     # Tests for 4x4 board
     assert four.n == 4
     assert four.size == 200
-    assert four.turn == "black"
-    assert four.black == 0
-    assert four.white == 0
+    assert four.turn == o.BLACK
+    assert four.black == 2
+    assert four.white == 2
+    assert four._nn == 16
     assert len(four.pieces) == 16
-    assert all(four.pieces) == False  # Every value is None
+    assert [loc for loc, piece in enumerate(four.pieces) if piece] == [5, 6, 9, 10]
+    assert four.black_bb == bitboard(6, 9) and four.white_bb == bitboard(5, 10)
+    assert four.valid_moves == four.find_valid_moves_bb(four.black_bb, four.white_bb)[1]
     
     # Tests for 6x6 board
     assert six.n == 6
     assert six.size == 300
-    assert six.turn == "black"
-    assert six.black == 0
-    assert six.white == 0
+    assert six.turn == o.BLACK
+    assert six.black == 2
+    assert six.white == 2
+    assert six._nn == 36
+    assert list(six._row_start[:13]) == [0]*6 + [6]*6 + [12]
+    assert list(six._row_end[:13]) == [5]*6 + [11]*6 + [17]
     assert len(six.pieces) == 36
-    assert all(six.pieces) == False  # Every value is None
+    assert [loc for loc, piece in enumerate(six.pieces) if piece] == [14, 15, 20, 21]
+    assert six.black_bb == bitboard(15, 20) and six.white_bb == bitboard(14, 21)
 
     # Tests for 8x8 board
     assert eight.n == 8
     assert eight.size == 400
-    assert eight.turn == "black"
-    assert eight.black == 0
-    assert eight.white == 0
+    assert eight.turn == o.BLACK
+    assert eight.black == 2
+    assert eight.white == 2
     assert len(eight.pieces) == 64
-    assert all(eight.pieces) == False  # Every value is None
+    assert [loc for loc, piece in enumerate(eight.pieces) if piece] == [27, 28, 35, 36]
+    assert eight.black_bb == bitboard(28, 35) and eight.white_bb == bitboard(27, 36)
 
 
-def test_init_squares():
-    # This function also indirectly tests the Squares.__init__ method
+def test_init_squares(four, six, eight):
+    # The squares are stored as parallel coordinate arrays indexed by location
 
     # Test invalid values first
     with pt.raises(AssertionError) as string:
@@ -136,16 +193,16 @@ def test_init_squares():
         four.init_squares(["h", 3, 6.8])
     with pt.raises(AssertionError) as flt:
         four.init_squares(4.5)
-    assert "corner must be an integer" in str(string.value)
-    assert "corner must be an integer" in str(lst.value)
-    assert "corner must be an integer" in str(flt.value)
-
-    # Function for testing squares' index values
-    def squares_are_correct_index_values(board_object):
-        # Squares have location value according to their place on the board,
-        # which is assigned by list index
-        for index, square in enumerate(board_object.squares):
-            if square.location != index:
+    assert string.value.args[0] == "corner must be an integer"
+    assert lst.value.args[0] == "corner must be an integer"
+    assert flt.value.args[0] == "corner must be an integer"
+
+    # Function for testing that there is one entry per square in each array
+    def squares_have_correct_lengths(board_object):
+        arrays = (board_object._sq_x, board_object._sq_y, 
+                  board_object._sq_cx, board_object._sq_cy)
+        for arr in arrays:
+            if len(arr) != board_object.n**2:
                 return False
         return True
 
@@ -155,8 +212,7 @@ def test_init_squares():
         # Checks the first row of the board to make
         # sure x increments by 50
         for index in range(board_object.n):
-            square = board_object.squares[index]
-            if square.x != x or square.y != y:          # y remains constant
+            if board_object._sq_x[index] != x or board_object._sq_y[index] != y:  # y remains constant
                 return False
             x += 50
         return True
@@ -164,29 +220,37 @@ def test_init_squares():
     # Function for testing correct y increments (50)
     def squares_increment_y_correctly(board_object):
         y = x = (-board_object.n * SQUARE) // 2                 # Same definition as is in the class for the start (x, y)
-        # Checks the first row of the board to make sure
-        # x increments by 50
-        for index in range(0, board_object.n, board_object.n):  # Increment by n to get 1st column
-            square = board_object.squares[index]
-            if square.y != y or square.x != x:                  # x remains constant
+        # Checks the first column of the board to make sure
+        # y increments by 50
+        n = board_object.n
+        for index in range(0, n * n, n):                        # Increment by n to get 1st column
+            if board_object._sq_y[index] != y or board_object._sq_x[index] != x:  # x remains constant
                 return False
             y += 50
         return True
+
+    # Function for testing that centers are half a square from the corner
+    def squares_have_correct_centers(board_object):
+        for index in range(board_object.n**2):
+            if (board_object._sq_cx[index] != board_object._sq_x[index] + 25 or
+                    board_object._sq_cy[index] != board_object._sq_y[index] + 25):
+                return False
+        return True
     
-    # Test Square.location values
-    assert squares_are_correct_index_values(four)
-    assert squares_are_correct_index_values(six)
-    assert squares_are_correct_index_values(eight)
+    # Test array lengths
+    assert squares_have_correct_lengths(four)
+    assert squares_have_correct_lengths(six)
+    assert squares_have_correct_lengths(eight)
 
     # Test starting square location
-    assert four.squares[0].x == -100 and four.squares[0].y == -100
-    assert six.squares[0].x == -150 and six.squares[0].y == -150
-    assert eight.squares[0].x == -200 and eight.squares[0].y == -200
+    assert four._sq_x[0] == -100 and four._sq_y[0] == -100
+    assert six._sq_x[0] == -150 and six._sq_y[0] == -150
+    assert eight._sq_x[0] == -200 and eight._sq_y[0] == -200
 
     # Test last square location
-    assert four.squares[-1].x == 50 and four.squares[-1].y == 50
-    assert six.squares[-1].x == 100 and six.squares[-1].y == 100
-    assert eight.squares[-1].x == 150 and eight.squares[-1].y == 150
+    assert four._sq_x[-1] == 50 and four._sq_y[-1] == 50
+    assert six._sq_x[-1] == 100 and six._sq_y[-1] == 100
+    assert eight._sq_x[-1] == 150 and eight._sq_y[-1] == 150
 
     # Test x value increments
     assert squares_increment_x_correctly(four)
@@ -198,16 +262,44 @@ def test_init_squares():
     assert squares_increment_y_correctly(six)
     assert squares_increment_y_correctly(eight)
 
+    # Test center coordinates
+    assert squares_have_correct_centers(four)
+    assert squares_have_correct_centers(six)
+    assert squares_have_correct_centers(eight)
+    assert four._sq_cx[0] == -75 and four._sq_cy[0] == -75
 
-def test_switch_turns():
+
+def test_switch_turns(four):
     # turn starts with black
     four.switch_turns()
-    assert four.turn == "white"
+    assert four.turn == o.WHITE
     four.switch_turns()
-    assert four.turn == "black"
+    assert four.turn == o.BLACK
+
 
+def test_find_clicked_square(four, eight):
+    # The 4x4 board spans -100 to 100 on both axes
 
-def test_find_center_squares():
+    # Clicks inside squares
+    assert four.find_clicked_square(-75, -75) == 0      # lower left square
+    assert four.find_clicked_square(75, -75) == 3       # lower right square
+    assert four.find_clicked_square(-75, 75) == 12      # upper left square
+    assert four.find_clicked_square(75, 75) == 15       # upper right square
+    assert four.find_clicked_square(0.5, 0.5) == 10     # turtle gives floats
+    assert eight.find_clicked_square(-25, 10) == 35
+
+    # Clicks on lines
+    assert four.find_clicked_square(-100, -75) == -1
+    assert four.find_clicked_square(-75, 0) == -1
+    assert four.find_clicked_square(50, 50) == -1
+
+    # Clicks off the board
+    assert four.find_clicked_square(-101, 0) == -1
+    assert four.find_clicked_square(25, 101) == -1
+    assert four.find_clicked_square(300, 300) == -1
+
+
+def test_find_center_squares(four, six, eight):
     # This functions uses self.n to calculate the center squares.
     # It only works when self.n is an even number.
     # As shown above, the GameBoard class can only be initialized with
@@ -220,8 +312,12 @@ def test_find_center_squares():
     assert six.find_center_squares() == (20, 21, 15, 14)
     assert eight.find_center_squares() == (35, 36, 28, 27)
 
+    # The squares are calculated once when the board is made
+    assert four.init_center_squares() == (9, 10, 6, 5)
+    assert eight.find_center_squares() is eight.find_center_squares()
+
 
-def test_place_argument_validity():
+def test_place_argument_validity(four):
     # place only calls other functions, so it's validity is best tested
     # by testing those other functions. However, it takes one argument
     # that must be a positive integer between -1 and n**2 exclusive, which can be
@@ -236,39 +332,32 @@ def test_place_argument_validity():
     with pt.raises(AssertionError) as too_big:
         four.place(16)  # Last index should be one less than n**2
     
-    assert "location must be an integer" in str(string.value)
-    assert "location must be an integer" in str(lst.value)
-    assert "location must be within the size of the board" in str(negative.value)
-    assert "location must be within the size of the board" in str(too_big.value)
+    assert string.value.args[0] == "location must be an integer"
+    assert lst.value.args[0] == "location must be an integer"
+    assert negative.value.args[0] == "location must be within the size of the board"
+    assert too_big.value.args[0] == "location must be within the size of the board"
 
 
-def test_is_full():
-    # Operates on GameBoard.pieces list. is_full does not test if there are
-    # values in GameBoard.pieces that are not GamePiece objects. Thus, a list
-    # of integers could potentially evaluate to True. This is a short coming,
-    # but I also do not expect anything other than GamePieces to be added to
-    # the list since game-play is only accomplished via clicks on a GUI.
+def test_is_full(four, eight):
+    # Operates on the GameBoard.black_bb and GameBoard.white_bb bitboards.
+    # The board is full when every square has a bit set in one of them.
 
     # Only the starting tiles are on the board currently
     assert four.is_full() == False
+    assert four._full_mask == 0xFFFF
+    assert eight._full_mask == 2**64 - 1
 
-    # Test Squares
-    one = o.Square(0, 25, 25)
-    two = o.Square(1, 75, 75)
-    three = o.Square(2, 25, 75)
-    _four = o.Square(3, 75, 25)     # underscore is due to the GameBoard four
-    full = [one, two, three, _four]
-
-    four.pieces = full
+    # Fill the board, half black and half white
+    four.black_bb = bitboard(*range(0, 8))
+    four.white_bb = bitboard(*range(8, 16))
     assert four.is_full() == True
 
     # Delete one, test again
-    not_full = [one, two, three, None]
-    four.pieces = not_full
+    four.white_bb = bitboard(*range(8, 15))
     assert four.is_full() == False
 
 
-def test_find_winner():
+def test_find_winner(four):
 
     # Tie
     four.black = 5
@@ -292,14 +381,87 @@ def test_find_winner():
     assert score == "black: 2, white: 10"
 
 
-def test_set_increment():
+def test_save_score(tmp_path, four):
+    # tmp_path is a temporary directory provided by pytest
+    log = str(tmp_path / "scores.log")
+    top = str(tmp_path / "scores_top.txt")
+
+    def read(path):
+        with open(path) as f:
+            return f.read().splitlines()
+
+    # Test invalid input
+    with pt.raises(AssertionError) as name_not_str:
+        four.save_score(5, log, top)
+    with pt.raises(AssertionError) as top_not_str:
+        four.save_score("Ann", log, None)
+    assert name_not_str.value.args[0] == "name must be a string"
+    assert top_not_str.value.args[0] == "top_path must be a string"
+
+    # Both files are created by the first save
+    four.black = 10
+    four.save_score("Ann", log, top)
+    assert read(log) == ["Ann 10"]
+    assert read(top) == ["Ann 10"]
+
+    # The log keeps play order, the high scores are highest first and
+    # equal scores keep the earlier game first. Names may contain spaces.
+    for name, score in (("Bob", 12), ("Cy", 3), ("Di Ng", 10)):
+        four.black = score
+        four.save_score(name, log, top)
+    assert read(log) == ["Ann 10", "Bob 12", "Cy 3", "Di Ng 10"]
+    assert read(top) == ["Bob 12", "Ann 10", "Di Ng 10", "Cy 3"]
+
+    # Only the best HIGH_SCORES_SIZE scores are kept
+    for score in range(20, 20 + o.HIGH_SCORES_SIZE):
+        four.black = score
+        four.save_score("Ed", log, top)
+    assert len(read(top)) == o.HIGH_SCORES_SIZE
+    assert read(top)[0] == "Ed " + str(19 + o.HIGH_SCORES_SIZE)
+    assert "Bob 12" not in read(top)
+    assert len(read(log)) == 4 + o.HIGH_SCORES_SIZE
+
+    # A low score is logged without touching the high scores
+    four.black = 0
+    four.save_score("Flo", log, top)
+    assert read(log)[-1] == "Flo 0"
+    assert "Flo 0" not in read(top)
+
+
+def test_zobrist_hash(four, eight):
+    # Every (color, location) pair has its own 64 bit number
+    assert len(four._zobrist) == 2
+    assert len(four._zobrist[0]) == 16 and len(four._zobrist[1]) == 16
+    assert len(set(four._zobrist[0] + four._zobrist[1])) == 32
+    assert all(0 <= z < 2**64 for z in eight._zobrist[1])
+
+    # Boards of the same size share numbers, so hashes are comparable
+    assert four._zobrist == o.GameBoard(4)._zobrist
+
+    # An empty board hashes to 0
+    four.black_bb, four.white_bb = 0, 0
+    assert four._hash == 0 == four.zobrist_hash()
+
+    # Setting the bitboards keeps the hash up to date
+    four.black_bb = bitboard(5, 10)
+    assert four._hash == four._zobrist[0][5] ^ four._zobrist[0][10]
+    four.white_bb = bitboard(6)
+    assert four._hash == four._zobrist[0][5] ^ four._zobrist[0][10] ^ four._zobrist[1][6]
+    assert four._hash == four.zobrist_hash()
+
+    # The same tiles in different colors hash differently
+    four.black_bb, four.white_bb = bitboard(6), bitboard(5, 10)
+    assert four._hash != four._zobrist[0][5] ^ four._zobrist[0][10] ^ four._zobrist[1][6]
+
+
+def test_set_increment(four, six, eight):
     # Takes a string in (n, ne, e, se, s, sw, w, nw) and returns a specific
     # increment value for traversing the board by index in that direction.
 
     # Test invalid input
     with pt.raises(AssertionError) as not_valid:
         four.set_increment("Northeast")
-    assert "direction must be one of n, ne, e, se, s, sw, w, nw" in str(not_valid.value)
+    assert not_valid.value.args[0] == DIRECTION_MSG
 
     # Test valid inputs
     assert four.set_increment("n") == 4
@@ -335,8 +497,7 @@ def test_set_increment():
     assert eight.set_increment("nw") == 7
 
 
-def test_set_max_min():
-    ### Test invalid input
+def test_set_max_min_invalid(four):
     with pt.raises(AssertionError) as direction_not_valid:
         four.set_max_min(0, "Northeast")
     with pt.raises(AssertionError) as location_not_int:
@@ -346,223 +507,57 @@ def test_set_max_min():
     with pt.raises(AssertionError) as location_too_big:
         four.set_max_min(16, "n")
     
-    assert "direction must be one of n, ne, e, se, s, sw, w, nw" in str(direction_not_valid.value)
-    assert "location must be a valid board index" in str(location_not_int.value)
-    assert "location must be a valid board index" in str(location_negative.value)
-    assert "location must be a valid board index" in str(location_too_big.value)
-
-    ### Test valid inputs. Note that the board is a 2D n by n grid.
-    ### The first test include the whole board as this is an important
-    ### function. For larger boards, only a few indexes are tested
-    ### to verify it still works with larger boards.
-    ## 4x4 board
-    # North
-    assert four.set_max_min(0, "n") == 15
-    assert four.set_max_min(1, "n") == 15
-    assert four.set_max_min(2, "n") == 15
-    assert four.set_max_min(3, "n") == 15
-    assert four.set_max_min(4, "n") == 15
-    assert four.set_max_min(5, "n") == 15
-    assert four.set_max_min(6, "n") == 15
-    assert four.set_max_min(7, "n") == 15
-    assert four.set_max_min(8, "n") == 15
-    assert four.set_max_min(9, "n") == 15
-    assert four.set_max_min(10, "n") == 15
-    assert four.set_max_min(11, "n") == 15
-    assert four.set_max_min(12, "n") == 15
-    assert four.set_max_min(13, "n") == 15
-    assert four.set_max_min(14, "n") == 15
-    assert four.set_max_min(15, "n") == 15
-
-    # South
-    assert four.set_max_min(0, "s") == 0
-    assert four.set_max_min(1, "s") == 0
-    assert four.set_max_min(2, "s") == 0
-    assert four.set_max_min(3, "s") == 0
-    assert four.set_max_min(4, "s") == 0
-    assert four.set_max_min(5, "s") == 0
-    assert four.set_max_min(6, "s") == 0
-    assert four.set_max_min(7, "s") == 0
-    assert four.set_max_min(8, "s") == 0
-    assert four.set_max_min(9, "s") == 0
-    assert four.set_max_min(10, "s") == 0
-    assert four.set_max_min(11, "s") == 0
-    assert four.set_max_min(12, "s") == 0
-    assert four.set_max_min(13, "s") == 0
-    assert four.set_max_min(14, "s") == 0
-    assert four.set_max_min(15, "s") == 0
-
-    # East
-    assert four.set_max_min(0, "e") == 3
-    assert four.set_max_min(1, "e") == 3
-    assert four.set_max_min(2, "e") == 3
-    assert four.set_max_min(3, "e") == 3
-    assert four.set_max_min(4, "e") == 7
-    assert four.set_max_min(5, "e") == 7
-    assert four.set_max_min(6, "e") == 7
-    assert four.set_max_min(7, "e") == 7
-    assert four.set_max_min(8, "e") == 11
-    assert four.set_max_min(9, "e") == 11
-    assert four.set_max_min(10, "e") == 11
-    assert four.set_max_min(11, "e") == 11
-    assert four.set_max_min(12, "e") == 15
-    assert four.set_max_min(13, "e") == 15
-    assert four.set_max_min(14, "e") == 15
-    assert four.set_max_min(15, "e") == 15
-
-    # West
-    assert four.set_max_min(0, "w") == 0
-    assert four.set_max_min(1, "w") == 0
-    assert four.set_max_min(2, "w") == 0
-    assert four.set_max_min(3, "w") == 0
-    assert four.set_max_min(4, "w") == 4
-    assert four.set_max_min(5, "w") == 4
-    assert four.set_max_min(6, "w") == 4
-    assert four.set_max_min(7, "w") == 4
-    assert four.set_max_min(8, "w") == 8
-    assert four.set_max_min(9, "w") == 8
-    assert four.set_max_min(10, "w") == 8
-    assert four.set_max_min(11, "w") == 8
-    assert four.set_max_min(12, "w") == 12
-    assert four.set_max_min(13, "w") == 12
-    assert four.set_max_min(14, "w") == 12
-    assert four.set_max_min(15, "w") == 12
-
-    # Northeast
-    assert four.set_max_min(0, "ne") == 15
-    assert four.set_max_min(1, "ne") == 11
-    assert four.set_max_min(2, "ne") == 7
-    assert four.set_max_min(3, "ne") == 3
-    assert four.set_max_min(4, "ne") == 15
-    assert four.set_max_min(5, "ne") == 15
-    assert four.set_max_min(6, "ne") == 11
-    assert four.set_max_min(7, "ne") == 7
-    assert four.set_max_min(8, "ne") == 15
-    assert four.set_max_min(9, "ne") == 15
-    assert four.set_max_min(10, "ne") == 15
-    assert four.set_max_min(11, "ne") == 11
-    assert four.set_max_min(12, "ne") == 15
-    assert four.set_max_min(13, "ne") == 15
-    assert four.set_max_min(14, "ne") == 15
-    assert four.set_max_min(15, "ne") == 15
-
-    # Southeast
-    assert four.set_max_min(0, "se") == 0
-    assert four.set_max_min(1, "se") == 0
-    assert four.set_max_min(2, "se") == 0
-    assert four.set_max_min(3, "se") == 3
-    assert four.set_max_min(4, "se") == 0
-    assert four.set_max_min(5, "se") == 0
-    assert four.set_max_min(6, "se") == 3
-    assert four.set_max_min(7, "se") == 7
-    assert four.set_max_min(8, "se") == 0
-    assert four.set_max_min(9, "se") == 3
-    assert four.set_max_min(10, "se") == 7
-    assert four.set_max_min(11, "se") == 11
-    assert four.set_max_min(12, "se") == 3
-    assert four.set_max_min(13, "se") == 7
-    assert four.set_max_min(14, "se") == 11
-    assert four.set_max_min(15, "se") == 15
-
-    # Northwest
-    assert four.set_max_min(0, "nw") == 0
-    assert four.set_max_min(1, "nw") == 4
-    assert four.set_max_min(2, "nw") == 8
-    assert four.set_max_min(3, "nw") == 12
-    assert four.set_max_min(4, "nw") == 4
-    assert four.set_max_min(5, "nw") == 8
-    assert four.set_max_min(6, "nw") == 12
-    assert four.set_max_min(7, "nw") == 15
-    assert four.set_max_min(8, "nw") == 8
-    assert four.set_max_min(9, "nw") == 12
-    assert four.set_max_min(10, "nw") == 15
-    assert four.set_max_min(11, "nw") == 15
-    assert four.set_max_min(12, "nw") == 12
-    assert four.set_max_min(13, "nw") == 15
-    assert four.set_max_min(14, "nw") == 15
-    assert four.set_max_min(15, "nw") == 15
-
-    # Southwest
-    assert four.set_max_min(0, "sw") == 0
-    assert four.set_max_min(1, "sw") == 0
-    assert four.set_max_min(2, "sw") == 0
-    assert four.set_max_min(3, "sw") == 0
-    assert four.set_max_min(4, "sw") == 4
-    assert four.set_max_min(5, "sw") == 0
-    assert four.set_max_min(6, "sw") == 0
-    assert four.set_max_min(7, "sw") == 0
-    assert four.set_max_min(8, "sw") == 8
-    assert four.set_max_min(9, "sw") == 4
-    assert four.set_max_min(10, "sw") == 0
-    assert four.set_max_min(11, "sw") == 0
-    assert four.set_max_min(12, "sw") == 12
-    assert four.set_max_min(13, "sw") == 8
-    assert four.set_max_min(14, "sw") == 4
-    assert four.set_max_min(15, "sw") == 0
-
-    ## 8x8 board
-    # North
-    assert eight.set_max_min(24, "n") == 63
-    assert eight.set_max_min(27, "n") == 63
-    assert eight.set_max_min(31, "n") == 63
-
-    # South
-    assert eight.set_max_min(24, "s") == 0
-    assert eight.set_max_min(27, "s") == 0
-    assert eight.set_max_min(31, "s") == 0
-
-    # East
-    assert eight.set_max_min(24, "e") == 31
-    assert eight.set_max_min(27, "e") == 31
-    assert eight.set_max_min(31, "e") == 31
-
-    # West
-    assert eight.set_max_min(24, "w") == 24
-    assert eight.set_max_min(27, "w") == 24
-    assert eight.set_max_min(31, "w") == 24
-
-    # Northeast
-    assert eight.set_max_min(24, "ne") == 63
-    assert eight.set_max_min(27, "ne") == 63
-    assert eight.set_max_min(31, "ne") == 31
-
-    # Southeast
-    assert eight.set_max_min(24, "se") == 0
-    assert eight.set_max_min(27, "se") == 0
-    assert eight.set_max_min(31, "se") == 31
-
-    # Northwest
-    assert eight.set_max_min(24, "nw") == 24
-    assert eight.set_max_min(27, "nw") == 48
-    assert eight.set_max_min(31, "nw") == 63
-
-    # Southwest
-    assert eight.set_max_min(24, "sw") == 24
-    assert eight.set_max_min(27, "sw") == 0
-    assert eight.set_max_min(31, "sw") == 0
-
-
-# These GamePiece objects will be needed for the next tests
-p_0 = o.GamePiece(0, "white", 25, 25)
-p_1 = o.GamePiece(1, "white", 75, 25)
-p_2 = o.GamePiece(2, "white", 125, 25)
-p_3 = o.GamePiece(3, "white", 175, 25)
-p_4 = o.GamePiece(4, "white", 25, 75)
-p_5 = o.GamePiece(5, "white", 75, 75)
-p_6 = o.GamePiece(6, "white", 125, 75)
-p_7 = o.GamePiece(7, "white", 175, 75)
-p_8 = o.GamePiece(8, "white", 25, 125)
-p_9 = o.GamePiece(9, "white", 75, 125)
-p_10 = o.GamePiece(10, "white", 125, 125)
-p_11 = o.GamePiece(11, "white", 175, 125)
-p_12 = o.GamePiece(12, "white", 25, 175)
-p_13 = o.GamePiece(13, "white", 75, 175)
-p_14 = o.GamePiece(14, "white", 125, 175)
-p_15 = o.GamePiece(15, "white", 175, 175)
-
-
-def test_can_capture_in_direction():
-    ### Test invalid input
+    assert direction_not_valid.value.args[0] == DIRECTION_MSG
+    assert location_not_int.value.args[0] == INDEX_MSG
+    assert location_negative.value.args[0] == INDEX_MSG
+    assert location_too_big.value.args[0] == INDEX_MSG
+
+
+### Valid set_max_min inputs. Note that the board is a 2D n by n grid.
+### The 4x4 board is tested everywhere as this is an important
+### function. For the 8x8 board, only a few indexes in one row are tested
+### to verify it still works with larger boards.
+# Expected values for locations 0 to 15, by direction
+MAX_MIN_FOUR = {
+    "n":  [15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15],
+    "s":  [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+    "e":  [3, 3, 3, 3, 7, 7, 7, 7, 11, 11, 11, 11, 15, 15, 15, 15],
+    "w":  [0, 0, 0, 0, 4, 4, 4, 4, 8, 8, 8, 8, 12, 12, 12, 12],
+    "ne": [15, 11, 7, 3, 15, 15, 11, 7, 15, 15, 15, 11, 15, 15, 15, 15],
+    "se": [0, 0, 0, 3, 0, 0, 3, 7, 0, 3, 7, 11, 3, 7, 11, 15],
+    "nw": [0, 4, 8, 12, 4, 8, 12, 15, 8, 12, 15, 15, 12, 15, 15, 15],
+    "sw": [0, 0, 0, 0, 4, 0, 0, 0, 8, 4, 0, 0, 12, 8, 4, 0],
+}
+
+# Expected values for locations 24, 27 and 31, by direction
+MAX_MIN_EIGHT = {
+    "n":  [63, 63, 63],
+    "s":  [0, 0, 0],
+    "e":  [31, 31, 31],
+    "w":  [24, 24, 24],
+    "ne": [63, 63, 31],
+    "se": [0, 0, 31],
+    "nw": [24, 48, 63],
+    "sw": [24, 0, 0],
+}
+
+MAX_MIN_CASES = (
+    [("four", location, direction, expected)
+     for direction, values in MAX_MIN_FOUR.items()
+     for location, expected in enumerate(values)] +
+    [("eight", location, direction, expected)
+     for direction, values in MAX_MIN_EIGHT.items()
+     for location, expected in zip((24, 27, 31), values)]
+)
+
+
+@pt.mark.parametrize("board, location, direction, expected", MAX_MIN_CASES)
+def test_set_max_min(request, board, location, direction, expected):
+    board = request.getfixturevalue(board)
+    assert board.set_max_min(location, direction) == expected
+
+
+def test_can_capture_in_direction_invalid(four):
     with pt.raises(AssertionError) as direction_not_valid:
         four.can_capture_in_direction(0, "Northeast")
     with pt.raises(AssertionError) as location_not_int:
@@ -572,235 +567,55 @@ def test_can_capture_in_direction():
     with pt.raises(AssertionError) as location_too_big:
         four.can_capture_in_direction(16, "n")
     
-    assert "direction must be one of n, ne, e, se, s, sw, w, nw" in str(direction_not_valid.value)
-    assert "location must be a valid board index" in str(location_not_int.value)
-    assert "location must be a valid board index" in str(location_negative.value)
-    assert "location must be a valid board index" in str(location_too_big.value)
-
-    ### Test valid input
-    ## These tests will alter the GameBoard.pieces list for the sake of simplicity
-    ## East ##
-    four.turn == "black"
+    assert direction_not_valid.value.args[0] == DIRECTION_MSG
+    assert location_not_int.value.args[0] == INDEX_MSG
+    assert location_negative.value.args[0] == INDEX_MSG
+    assert location_too_big.value.args[0] == INDEX_MSG
+
+
+# A move location, a direction and the three squares out from it in that
+# direction, nearest first
+CAPTURE_LINES = [
+    (0, "e", (1, 2, 3)),
+    (3, "w", (2, 1, 0)),
+    (0, "n", (4, 8, 12)),
+    (12, "s", (8, 4, 0)),
+    (0, "ne", (5, 10, 15)),
+    (12, "se", (9, 6, 3)),
+    (3, "nw", (6, 9, 12)),
+    (15, "sw", (10, 5, 0)),
+]
+
+
+@pt.mark.parametrize("location, direction, line", CAPTURE_LINES)
+def test_can_capture_in_direction(four, location, direction, line):
+    ## These tests will alter the GameBoard bitboards for the sake of simplicity.
+    ## Each direction starts with a line of white tiles, then turns them black
+    ## one at a time starting from the far end.
+    near, middle, far = line
+    four.turn = o.BLACK
 
     # All opponent tiles
-    four.pieces = [None, p_1, p_2, p_3]
-    assert four.can_capture_in_direction(0, "e") == []
+    four.black_bb, four.white_bb = 0, bitboard(near, middle, far)
+    assert four.can_capture_in_direction(location, direction) == []
 
     # Capture two
-    p_3.change_color()
-    assert four.can_capture_in_direction(0, "e") == [p_1, p_2]
+    four.black_bb, four.white_bb = bitboard(far), bitboard(near, middle)
+    assert four.can_capture_in_direction(location, direction) == [near, middle]
 
     # Capture one
-    p_2.change_color()
-    assert four.can_capture_in_direction(0, "e") == [p_1]
+    four.black_bb, four.white_bb = bitboard(middle, far), bitboard(near)
+    assert four.can_capture_in_direction(location, direction) == [near]
 
     # Capture none
-    p_1.change_color()
-    assert four.can_capture_in_direction(0, "e") == []
-
-    four.pieces = [None, None, None, None]
-    assert four.can_capture_in_direction(0, "e") == []
-
-    # Reset colors
-    p_0.color = "white"
-    p_1.color = "white"
-    p_2.color = "white"
-    p_3.color = "white"
-
-    ## West ##
-    ## Further tests will use the same basic sequence as above
-    four.pieces = [p_0, p_1, p_2, None]
-    assert four.can_capture_in_direction(3, "w") == []
-    p_0.change_color() # black
-    assert four.can_capture_in_direction(3, "w") == [p_2, p_1]
-    p_1.change_color() # black
-    assert four.can_capture_in_direction(3, "w") == [p_2]
-    p_2.change_color() # black
-    assert four.can_capture_in_direction(3, "w") == []
-    four.pieces = [None, None, None, None]
-    assert four.can_capture_in_direction(3, "w") == []
-
-    # Reset colors
-    p_0.color = "white"
-    p_1.color = "white"
-    p_2.color = "white"
-    p_3.color = "white"
-
-    ## North ##
-    # Note that this board is inverted so 0 is top left, not bottom left
-    four.pieces = [
-        None, None, None, None,
-        p_4, None, None, None,
-        p_8, None, None, None,
-        p_12, None, None, None,
-    ]
-    assert four.can_capture_in_direction(0, "n") == []
-    p_12.change_color()  # black
-    assert four.can_capture_in_direction(0, "n") == [p_4, p_8]
-    p_8.change_color()   # black
-    assert four.can_capture_in_direction(0, "n") == [p_4]
-    p_4.change_color()   # black
-    assert four.can_capture_in_direction(0, "n") == []
-    four.pieces = [
-        None, None, None, None,
-        None, None, None, None,
-        None, None, None, None,
-        None, None, None, None,
-    ]
-    assert four.can_capture_in_direction(0, "n") == []
-
-    # Reset colors
-    p_0.color = "white"
-    p_4.color = "white"
-    p_8.color = "white"
-    p_12.color = "white"
-
-    ## South ##
-    # Note that this board is inverted so 0 is top left, not bottom left
-    four.pieces = [
-        p_0, None, None, None,
-        p_4, None, None, None,
-        p_8, None, None, None,
-        None, None, None, None,
-    ]
-    assert four.can_capture_in_direction(12, "s") == []
-    p_0.change_color()  # black
-    assert four.can_capture_in_direction(12, "s") == [p_8, p_4]
-    p_4.change_color()   # black
-    assert four.can_capture_in_direction(12, "s") == [p_8]
-    p_8.change_color()   # black
-    assert four.can_capture_in_direction(12, "s") == []
-    four.pieces = [
-        None, None, None, None,
-        None, None, None, None,
-        None, None, None, None,
-        None, None, None, None,
-    ]
-    assert four.can_capture_in_direction(12, "s") == []
-
-    # Reset colors
-    p_0.color = "white"
-    p_4.color = "white"
-    p_8.color = "white"
-    p_12.color = "white"
-
-    ## Northeast ##
-    # Note that this board is inverted so 0 is top left, not bottom left
-    four.pieces = [
-        None, None, None, None,
-        None, p_5, None, None,
-        None, None, p_10, None,
-        None, None, None, p_15,
-    ]
-    assert four.can_capture_in_direction(0, "ne") == []
-    p_15.change_color()  # black
-    assert four.can_capture_in_direction(0, "ne") == [p_5, p_10]
-    p_10.change_color()  # black
-    assert four.can_capture_in_direction(0, "ne") == [p_5]
-    p_5.change_color()   # black
-    assert four.can_capture_in_direction(0, "ne") == []
-    four.pieces = [
-        None, None, None, None,
-        None, None, None, None,
-        None, None, None, None,
-        None, None, None, None,
-    ]
-    assert four.can_capture_in_direction(0, "ne") == []
-
-    # Reset colors
-    p_0.color = "white"
-    p_5.color = "white"
-    p_10.color = "white"
-    p_15.color = "white"
-
-    ## Southeast ##
-    four.pieces = [
-        None, None, None, p_3,
-        None, None, p_6, None,
-        None, p_9, None, None,
-        None, None, None, None,
-    ]
-    assert four.can_capture_in_direction(12, "se") == []
-    p_3.change_color()
-    assert four.can_capture_in_direction(12, "se") == [p_9, p_6]
-    p_6.change_color()
-    assert four.can_capture_in_direction(12, "se") == [p_9]
-    p_9.change_color()
-    assert four.can_capture_in_direction(12, "se") == []
-    four.pieces = [
-        None, None, None, None,
-        None, None, None, None,
-        None, None, None, None,
-        None, None, None, None,
-    ]
-    assert four.can_capture_in_direction(12, "se") == []
-
-    # Reset colors
-    p_3.color = "white"
-    p_6.color = "white"
-    p_9.color = "white"
-    p_12.color = "white"
-
-    ## Northwest ##
-    # Note that this board is inverted so 0 is top left, not bottom left
-    four.pieces = [
-        None, None, None, None,
-        None, None, p_6, None,
-        None, p_9, None, None,
-        p_12, None, None, None,
-    ]
-    assert four.can_capture_in_direction(3, "nw") == []
-    p_12.change_color()
-    assert four.can_capture_in_direction(3, "nw") == [p_6, p_9]
-    p_9.change_color()
-    assert four.can_capture_in_direction(3, "nw") == [p_6]
-    p_6.change_color()
-    assert four.can_capture_in_direction(3, "nw") == []
-    four.pieces = [
-        None, None, None, None,
-        None, None, None, None,
-        None, None, None, None,
-        None, None, None, None,
-    ]
-    assert four.can_capture_in_direction(3, "nw") == []
-
-    # Reset colors
-    p_3.color = "white"
-    p_6.color = "white"
-    p_9.color = "white"
-    p_12.color = "white"
-
-    ## Southwest ##
-    # Note that this board is inverted so 0 is top left, not bottom left
-    four.pieces = [
-        p_0, None, None, None,
-        None, p_5, None, None,
-        None, None, p_10, None,
-        None, None, None, None,
-    ]
-    assert four.can_capture_in_direction(15, "sw") == []
-    p_0.color = "black"
-    assert four.can_capture_in_direction(15, "sw") == [p_10, p_5]
-    p_5.color = "black"
-    assert four.can_capture_in_direction(15, "sw") == [p_10]
-    p_10.color = "black"
-    assert four.can_capture_in_direction(15, "sw") == []
-    four.pieces = [
-        None, None, None, None,
-        None, None, None, None,
-        None, None, None, None,
-        None, None, None, None,
-    ]
-    assert four.can_capture_in_direction(15, "sw") == []
-
-    # Reset colors
-    p_0.color = "white"
-    p_5.color = "white"
-    p_10.color = "white"
-    p_15.color = "white"
-
-
-def test_all_can_capture():
+    four.black_bb, four.white_bb = bitboard(near, middle, far), 0
+    assert four.can_capture_in_direction(location, direction) == []
+
+    four.black_bb, four.white_bb = 0, 0
+    assert four.can_capture_in_direction(location, direction) == []
+
+
+def test_all_can_capture(four):
     # Invalid entries
     with pt.raises(AssertionError) as location_not_int:
         four.all_can_capture("hello")
@@ -809,298 +624,439 @@ def test_all_can_capture():
     with pt.raises(AssertionError) as location_too_big:
         four.all_can_capture(16)
 
-    assert "location must be a valid board index" in str(location_not_int.value)
-    assert "location must be a valid board index" in str(location_negative.value)
-    assert "location must be a valid board index" in str(location_too_big.value)
+    assert location_not_int.value.args[0] == INDEX_MSG
+    assert location_negative.value.args[0] == INDEX_MSG
+    assert location_too_big.value.args[0] == INDEX_MSG
 
     # Valid entries
 
-    four.turn = "black"
+    four.turn = o.BLACK
     # Empty board
-    four.pieces = [
-        None, None, None, None,
-        None, None, None, None,
-        None, None, None, None,
-        None, None, None, None,
-    ]
+    four.black_bb, four.white_bb = 0, 0
     for index in range(0, 16):
         assert four.all_can_capture(index) == []
 
     # Maximum Captured
-    four.pieces = [
-        None, p_1, p_2, p_3,
-        p_4, p_5, None, None,
-        p_8, None, p_10, None,
-        p_12, None, None, p_15,
-    ]
-    p_12.color = "black"
-    p_15.color = "black"
-    p_3.color = "black"
-    assert four.all_can_capture(0) == [p_4, p_8, p_5, p_10, p_1, p_2]
-
-    p_3.color = "white"
-    assert four.all_can_capture(0) == [p_4, p_8, p_5, p_10]
-
-    p_2.color = "black"
-    assert four.all_can_capture(0) == [p_4, p_8, p_5, p_10, p_1]
-
-    p_2.color = "white"
-    p_12.color = "white"
-    p_15.color = "white"
+    four.black_bb = bitboard(3, 12, 15)
+    four.white_bb = bitboard(1, 2, 4, 5, 8, 10)
+    assert four.all_can_capture(0) == [4, 8, 5, 10, 1, 2]
+
+    # 3 becomes white
+    four.black_bb = bitboard(12, 15)
+    four.white_bb = bitboard(1, 2, 3, 4, 5, 8, 10)
+    assert four.all_can_capture(0) == [4, 8, 5, 10]
+
+    # 2 becomes black
+    four.black_bb = bitboard(2, 12, 15)
+    four.white_bb = bitboard(1, 3, 4, 5, 8, 10)
+    assert four.all_can_capture(0) == [4, 8, 5, 10, 1]
 
     # The following board layout is 6x6
-    six.pieces = [None for i in range(six.n**2)]
+    six = o.GameBoard.from_bitboards(6, SIX_BLACK, SIX_WHITE)
+    assert six.all_can_capture(14) == [20, 26, 21, 28, 15, 16, 9, 8, 7, 13, 19]
+
+    # 35 becomes white
+    six = o.GameBoard.from_bitboards(
+        6, SIX_BLACK ^ bitboard(35), SIX_WHITE | bitboard(35))
+    assert six.all_can_capture(14) == [20, 26, 15, 16, 9, 8, 7, 13, 19]
+
+
+@pt.fixture(scope="module")
+def midgame():
+    return o.GameBoard.from_bitboards(6, SIX_BLACK, SIX_WHITE)
+
+
+def test_find_valid_moves(midgame):
+    expected = {k: ray_captures(midgame, SIX_BLACK, SIX_WHITE, k) 
+                for k in (14, 23, 33)}
+    assert midgame.valid_moves == expected
+    assert midgame.find_valid_moves() == expected
+
+
+@pt.mark.parametrize("location", range(36))
+def test_all_can_capture_matches_rays(midgame, location):
+    expected = ray_captures(midgame, SIX_BLACK, SIX_WHITE, location)
+    assert bitboard(*midgame.all_can_capture(location)) == expected
+    assert midgame.valid_moves.get(location, 0) == expected
+
+
+def test_from_bitboards(six):
+    black, white = SIX_BLACK, SIX_WHITE
+    board = o.GameBoard.from_bitboards(6, black, white, o.WHITE)
+    assert (board.black_bb, board.white_bb) == (black, white)
+    assert (board.black, board.white, board.turn) == (8, 11, o.WHITE)
+    placed = [i for i, piece in enumerate(board.pieces) if piece is not None]
+    assert placed == o.bit_locations(black | white)
+    assert board.pieces[2].color == "black" and board.pieces[7].color == "white"
+    assert board.pieces[2].item is None
+    assert board.valid_moves == board.find_valid_moves_bb(white, black)[1]
+
+    # Same position, same hash, as a board that got there by placing tiles
+    placed = o.GameBoard(6)
+    assert (six.black_bb, six.white_bb) == (placed.black_bb, placed.white_bb)
+    assert six._hash == placed._hash
+    assert six.valid_moves == placed.valid_moves
+
+    # Moves can be played on it like any other board
+    location = next(iter(six.valid_moves))
+    six.make_move(location)
+    assert six.black_bb & bitboard(location)
+    assert six.turn == o.WHITE
+
+
+def test_find_valid_moves_cache(six):
+    six.black_bb, six.white_bb = SIX_BLACK, SIX_WHITE
+
+    # The same position gives back the same moves without searching again
+    moves = six.find_valid_moves()
+    assert six.find_valid_moves() is moves
+    assert (o.BLACK, six._hash) in six._moves_cache
+
+    # A different position is not mistaken for a cached one
+    six.white_bb |= bitboard(35)
+    six.black_bb ^= bitboard(35)
+    assert six.find_valid_moves() is not moves
+    assert six.find_valid_moves()[14] != moves[14]
+
+    # The cache never grows past its limit
+    for i in range(o.MOVES_CACHE_SIZE + 10):
+        six.black_bb, six.white_bb = i, 0
+        six.find_valid_moves()
+    assert len(six._moves_cache) == o.MOVES_CACHE_SIZE
+
+
+def test_find_valid_moves_bb(four, six):
+    # Starting position of a 4x4 board, black to move
+    four.black_bb, four.white_bb = bitboard(5, 10), bitboard(6, 9)
+    moves, captures = four.find_valid_moves_bb(four.black_bb, four.white_bb)
+    assert moves == bitboard(2, 7, 8, 13)
+    assert captures == {2: bitboard(6), 7: bitboard(6), 8: bitboard(9), 13: bitboard(9)}
+
+    # Lines must not wrap around the edges of the board. Black at 3 and
+    # white at 4 are neighbors by index but on different rows.
+    four.black_bb, four.white_bb = bitboard(3), bitboard(4)
+    assert four.find_valid_moves_bb(four.black_bb, four.white_bb) == (0, {})
+
+    # Same layout on the 6x6 board as test_find_valid_moves
+    moves, captures = six.find_valid_moves_bb(SIX_BLACK, SIX_WHITE)
+    assert moves == bitboard(14, 23, 33)
+
+
+def test_init_direction_tables(four, eight):
+    # Increments are stored in DIRECTIONS order: n, ne, e, se, s, sw, w, nw
+    assert four._dir_incs == (4, 5, 1, -3, -4, -5, -1, 3)
+    assert eight._dir_incs == (8, 9, 1, -7, -8, -9, -1, 7)
+
+    # Ends are one step past the value of find_max_min, for use in range()
+    assert len(four._dir_end) == 16 * 8
+    for location in range(16):
+        for d, direction in enumerate(o.DIRECTIONS):
+            step = 1 if four._dir_incs[d] > 0 else -1
+            end = four.find_max_min(location, direction) + step
+            assert four._dir_end[location * 8 + d] == end
+
+
+def test_init_rays(four):
+    # Rays are stored in DIRECTIONS order: n, ne, e, se, s, sw, w, nw
+    assert len(four.rays) == 16
+    assert four.rays[0] == (
+        bitboard(4, 8, 12),     # n
+        bitboard(5, 10, 15),    # ne
+        bitboard(1, 2, 3),      # e
+        0, 0, 0, 0, 0           # se, s, sw, w, nw run off the board
+    )
+    assert four.rays[6] == (
+        bitboard(10, 14),       # n
+        bitboard(11),           # ne
+        bitboard(7),            # e
+        bitboard(3),            # se
+        bitboard(2),            # s
+        bitboard(1),            # sw
+        bitboard(5, 4),         # w
+        bitboard(9, 12)         # nw
+    )
+
+
+def test_init_shifts(four):
+    # One (left, right, mask) tuple per direction: n, ne, e, se, s, sw, w, nw
+    assert len(four.shifts) == 8
+    assert four.shifts[0] == (4, 0, 0xFFFF)         # n
+    assert four.shifts[1] == (5, 0, 0xEEEE)         # ne, drops first column
+    assert four.shifts[4] == (0, 4, 0xFFFF)         # s
+    assert four.shifts[6] == (0, 1, 0x7777)         # w, drops last column
+
+
+def test_choose_move(six):
+    six.valid_moves = {
+        1: bitboard(1),
+        2: bitboard(1, 2),
+        3: bitboard(1, 2, 3),
+        4: bitboard(1, 2, 3, 4),
+        5: bitboard(1)
+    }
+    assert six.choose_move() == 4
 
-    for i in [0, 2, 4, 12, 17, 24, 32, 35]:
-        six.pieces[i] = o.GamePiece(i, "black", 0, 0)  # x & y do not matter here
-    
-    for i in [7, 8, 9, 13, 15, 16, 19, 20, 21, 26, 28]:
-        six.pieces[i] = o.GamePiece(i, "white", 0, 0)
+    # Ties go to the first move found
+    six.valid_moves = {7: bitboard(1, 2), 3: bitboard(4, 5)}
+    assert six.choose_move() == 7
 
-    p = six.pieces
-    assert six.all_can_capture(14) == [p[20], p[26], p[21], p[28], p[15], p[16], p[9], p[8], p[7], p[13], p[19]]
+    six.valid_moves = {}
+    assert six.choose_move() == -1
 
-    p[35].color = "white"
-    assert six.all_can_capture(14) == [p[20], p[26], p[15], p[16], p[9], p[8], p[7], p[13], p[19]]
 
+def test_headless_game():
+    # Without init_graphics a GameBoard draws nothing, but can still be played
+    assert o.window is None
+    board = o.GameBoard(6)
+    assert board.black_bb == bitboard(15, 20) and board.white_bb == bitboard(14, 21)
+    while board.valid_moves:
+        board.make_move(board.choose_move())
+    assert board.black_bb & board.white_bb == 0
+    assert board.black + board.white == (board.black_bb | board.white_bb).bit_count()
 
-def test_find_valid_moves():
-    # This section sets up the board
-    six.pieces = [None for i in range(six.n**2)]
+########## /GameBoard Class Tests ##########
 
-    for i in [0, 2, 4, 12, 17, 24, 32, 35]:
-        six.pieces[i] = o.GamePiece(i, "black", 0, 0)  # x & y do not matter here
-    for i in [7, 8, 9, 13, 15, 16, 19, 20, 21, 26, 28]:
-        six.pieces[i] = o.GamePiece(i, "white", 0, 0)
+########## Function Tests ##########
 
-    assert six.find_valid_moves() == {
-        14: six.all_can_capture(14),
-        23: six.all_can_capture(23),
-        33: six.all_can_capture(33)
-    }
+def test_bit_locations():
+    assert o.bit_locations(0) == []
+    assert o.bit_locations(1) == [0]
+    assert o.bit_locations(0b1010) == [1, 3]
+    assert o.bit_locations(bitboard(0, 17, 35, 63)) == [0, 17, 35, 63]
 
 
-def test_choose_move():
-    six.valid_moves = {
-        1: [1],
-        2: [1, 2],
-        3: [1, 2, 3],
-        4: [1, 2, 3, 4],
-        5: [1]
-    }
-    assert six.choose_move() == 4
 
-    six.valid_moves = {}
-    assert six.choose_move() == -1
+def test_generate_moves(four, six, eight):
+    # Starting position of a 4x4 board, black to move
+    moves, captures = o.generate_moves(bitboard(5, 10), bitboard(6, 9), 4, four.shifts, four.rays)
+    assert moves == bitboard(2, 7, 8, 13)
+    assert captures == {2: bitboard(6), 7: bitboard(6), 8: bitboard(9), 13: bitboard(9)}
 
-########## /GameBoard Class Tests ##########
+    # Nothing to capture on an empty board
+    assert o.generate_moves(0, 0, 8, eight.shifts, eight.rays) == (0, {})
 
-########## Square Class Tests ##########
+    # Black at 0 captures the whole first row of a 6x6 board from 5
+    moves, captures = o.generate_moves(bitboard(0), bitboard(1, 2, 3, 4), 6, six.shifts, six.rays)
+    assert moves == bitboard(5)
+    assert captures == {5: bitboard(1, 2, 3, 4)}
 
-def test_invalid_Square_init():
-    # First check for invalid inputs
+    # The longest possible line on an 8x8 board, six tiles down a diagonal
+    moves, captures = o.generate_moves(bitboard(63), bitboard(9, 18, 27, 36, 45, 54), 8,
+                                       eight.shifts, eight.rays)
+    assert moves == bitboard(0)
+    assert captures == {0: bitboard(9, 18, 27, 36, 45, 54)}
 
-    # Testing location attribute
-    with pt.raises(AssertionError) as string:
-        o.Square("hello", 25, 25)
-    with pt.raises(AssertionError) as lst:
-        o.Square([1, 2, 3, 4], 25, 25)
-    with pt.raises(AssertionError) as floating:
-        o.Square(9.5, 25, 25)
-    with pt.raises(AssertionError) as negative:
-        o.Square(-1, 25, 25)
-    
-    assert "location must be a non-negative integer" in str(string.value)
-    assert "location must be a non-negative integer" in str(lst.value)
-    assert "location must be a non-negative integer" in str(floating.value)
-    assert "location must be a non-negative integer" in str(negative.value)
-
-    # Testing x & y values
-    with pt.raises(AssertionError) as x_string:
-        o.Square(0, "hello", 25)
-    with pt.raises(AssertionError) as y_string:
-        o.Square(1, 25, "hello")
-    with pt.raises(AssertionError) as x_floating:
-        o.Square(2, 25.5, 25)
-    with pt.raises(AssertionError) as y_floating:
-        o.Square(3, 25, 25.5)
-    with pt.raises(AssertionError) as x_lst:
-        o.Square(4, [2, 5], 25)
-    with pt.raises(AssertionError) as y_lst:
-        o.Square(4, 25, [2, 5])
-
-    assert "x & y must be integers" in str(x_string.value)
-    assert "x & y must be integers" in str(y_string.value)
-    assert "x & y must be integers" in str(x_floating.value)
-    assert "x & y must be integers" in str(y_floating.value)
-    assert "x & y must be integers" in str(x_lst.value)
-    assert "x & y must be integers" in str(y_lst.value)
+########## /Function Tests ##########
+
+########## Square Class Tests ##########
+
+# Square and GamePiece validate location and x & y the same way, so the
+# invalid argument tests run against both. Each entry makes an object from a
+# location and x & y, and gives the class's x & y message.
+MAKERS = {
+    "Square": (lambda location, x, y: o.Square(location, x, y),
+               "x & y must be integers"),
+    "GamePiece": (lambda location, x, y: o.GamePiece(location, "black", x, y),
+                  "x & y values must be integers"),
+}
+BAD_LOCATIONS = ["hello", [1, 2, 3, 4], 9.5, -1, True]
+BAD_COORDINATES = [("hello", 25), (25, "hello"), (25.5, 25), (25, 25.5), 
+                   ([2, 5], 25), (25, [2, 5]), (True, 25)]
+
+
+@pt.mark.parametrize("cls", MAKERS)
+@pt.mark.parametrize("location", BAD_LOCATIONS)
+def test_invalid_location(cls, location):
+    make = MAKERS[cls][0]
+    with pt.raises(AssertionError) as error:
+        make(location, 25, 25)
+    assert error.value.args[0] == "location must be a non-negative integer"
+
+
+@pt.mark.parametrize("cls", MAKERS)
+@pt.mark.parametrize("x, y", BAD_COORDINATES)
+def test_invalid_coordinates(cls, x, y):
+    make, xy_message = MAKERS[cls]
+    with pt.raises(AssertionError) as error:
+        make(0, x, y)
+    assert error.value.args[0] == xy_message
 
 
 ### Now test valid inputs
-# Make squares
-# x & y coordinates for each quadrant
-neg_neg = o.Square(0, -50, -50)
-pos_neg = o.Square(1, 50, -50)
-origin = o.Square(2, 0, 0)
-neg_pos = o.Square(3, -50, 50)
-pos_pos = o.Square(4, 50, 50)
-
-
-def test_valid_init():
-
-    assert pos_pos.location == 4
-    assert pos_pos.x == 50
-    assert pos_pos.y == 50
-    assert pos_pos.size == 50
-    assert pos_pos.center == (75, 75)
-
-    assert pos_neg.location == 1
-    assert pos_neg.x == 50
-    assert pos_neg.y == -50
-    assert pos_neg.size == 50
-    assert pos_neg.center == (75, -25)
-
-    assert neg_neg.location == 0
-    assert neg_neg.x == -50
-    assert neg_neg.y == -50
-    assert neg_neg.size == 50
-    assert neg_neg.center == (-25, -25)
-
-    assert neg_pos.location == 3
-    assert neg_pos.x == -50
-    assert neg_pos.y == 50
-    assert neg_pos.size == 50
-    assert neg_pos.center == (-25, 75)
-
-    assert origin.location == 2
-    assert origin.x == 0
-    assert origin.y == 0
-    assert origin.size == 50
-    assert origin.center == (25, 25)
-
-
-def test_calc_center():
-    # calc_center uses Square.x and Square.y, which are validated upon
-    # initialization as integers. This method is indirectly tested
-    # above, but is again here for the sake of completeness.
-
-    assert pos_pos.calc_center() == (75, 75)
-    assert pos_neg.calc_center() == (75, -25)
-    assert neg_neg.calc_center() == (-25, -25)
-    assert neg_pos.calc_center() == (-25, 75)
-    assert origin.calc_center() == (25, 25)
-    assert o.Square(5, 2, 54).calc_center() == (27, 79)
+# Squares with x & y coordinates in each quadrant
+@pt.fixture(scope="session")
+def squares():
+    return {
+        "neg_neg": o.Square(0, -50, -50),
+        "pos_neg": o.Square(1, 50, -50),
+        "origin": o.Square(2, 0, 0),
+        "neg_pos": o.Square(3, -50, 50),
+        "pos_pos": o.Square(4, 50, 50),
+    }
+
+
+@pt.mark.parametrize("name, location, x, y, center", [
+    ("pos_pos", 4, 50, 50, (75, 75)),
+    ("pos_neg", 1, 50, -50, (75, -25)),
+    ("neg_neg", 0, -50, -50, (-25, -25)),
+    ("neg_pos", 3, -50, 50, (-25, 75)),
+    ("origin", 2, 0, 0, (25, 25)),
+])
+def test_valid_init(squares, name, location, x, y, center):
+    # The center is set by calc_center during initialization, so checking
+    # it both ways also covers calc_center
+    square = squares[name]
+    assert (square.location, square.x, square.y, square.size) == (location, x, y, 50)
+    assert square.center == square.calc_center() == center
 
 
-def test_was_clicked():
-    # For these tests, note that all squares are 50x50 pixels and
-    # clicks on the line is considered a False value.
+def test_calc_center_off_grid():
+    assert o.Square(5, 2, 54).calc_center() == (27, 79)
+
 
+# Clicks on the origin square and whether each is inside it. All squares
+# are 50x50 pixels and clicks on the line are considered a False value.
+CLICK_CASES = [
     # Clicks inside
-    assert origin.was_clicked(25, 25) == True   # middle
-    assert origin.was_clicked(1, 1) == True     # lower left
-    assert origin.was_clicked(49, 49) == True   # upper right
-    assert origin.was_clicked(1, 49) == True    # upper left
-    assert origin.was_clicked(49, 1) == True    # lower right
+    (25, 25, True),     # middle
+    (1, 1, True),       # lower left
+    (49, 49, True),     # upper right
+    (1, 49, True),      # upper left
+    (49, 1, True),      # lower right
 
     # Clicks outside
-    assert origin.was_clicked(0, 0) == False
-    assert origin.was_clicked(50, 50) == False
-    assert origin.was_clicked(0, 50) == False
-    assert origin.was_clicked(50, 0) == False
-    assert origin.was_clicked(25, 0) == False
-    assert origin.was_clicked(0, 25) == False
-    assert origin.was_clicked(50, 25) == False
-    assert origin.was_clicked(25, 50) == False
-    assert origin.was_clicked(-3, 54) == False
-    assert origin.was_clicked(75, 90) == False
-
-
-def test_is_empty():
-    # Note that the GamePiece objects in the state list must have the same
-    # index as their location attribute and they must have center coordinates
-    # that are the same as the square that they are in (at least for the 
-    # game to be played correctly). Also, method can be given any list and
-    # still give an answer, it only tests for a None value in the location
-    # of the square. This is a weakness, but normal game-play would never
-    # cause a list of non-GamePiece objects to be tested.
-
-    # Set up test gameboard
-    test1 = o.GamePiece(0, "white", -25, -25)
-    test2 = o.GamePiece(2, "black", 25, 25)
-    board = [test1, None, test2, None, None]
-
-    # Test Square objects
-    assert neg_neg.is_empty(board) == False
-    assert neg_pos.is_empty(board) == True
-    assert origin.is_empty(board) == False
-    assert pos_neg.is_empty(board) == True
-    assert pos_pos.is_empty(board) == True
+    (0, 0, False),
+    (50, 50, False),
+    (0, 50, False),
+    (50, 0, False),
+    (25, 0, False),
+    (0, 25, False),
+    (50, 25, False),
+    (25, 50, False),
+    (-3, 54, False),
+    (75, 90, False),
+]
+
+
+@pt.mark.parametrize("x, y, expected", CLICK_CASES)
+def test_was_clicked(squares, x, y, expected):
+    assert squares["origin"].was_clicked(x, y) == expected
+
+
+def test_was_clicked_grid(squares):
+    # Every whole pixel in and around the origin square. Only the 49x49 
+    # pixels strictly inside its lines count as a click.
+    origin = squares["origin"]
+    wrong = [(x, y) for x in range(-5, 56) for y in range(-5, 56)
+             if origin.was_clicked(x, y) != (0 < x < 50 and 0 < y < 50)]
+    assert wrong == []
+
+
+@pt.mark.parametrize("name, expected", [
+    ("neg_neg", False),
+    ("neg_pos", True),
+    ("origin", False),
+    ("pos_neg", True),
+    ("pos_pos", True),
+])
+def test_is_empty(squares, name, expected):
+    # is_empty is given a bitboard of every tile on the board, and only 
+    # tests the bit for the square's location. It does not care which
+    # color the tile is. The test board has tiles in squares 0 and 2.
+    assert squares[name].is_empty(bitboard(0, 2)) == expected
+
+
+def test_Square_slots(squares):
+    assert not hasattr(squares["origin"], "__dict__")
+    with pt.raises(AttributeError):
+        squares["origin"].color = "black"
 
 ########## /Square Class Tests ##########
 
 ########## GamePiece Class Tests ##########
 
-def test_invalid_GamePiece_init():
-    # First check for invalid inputs
-
-    # Testing location attribute
-    with pt.raises(AssertionError) as string:
-        o.GamePiece("hello", "white", 25, 25)
-    with pt.raises(AssertionError) as lst:
-        o.GamePiece([1, 2, 3, 4], "black", 25, 25)
-    with pt.raises(AssertionError) as floating:
-        o.GamePiece(9.5, "white", 25, 25)
-    with pt.raises(AssertionError) as negative:
-        o.GamePiece(-1, "black", 25, 25)
-    
-    assert "location must be a non-negative integer" in str(string.value)
-    assert "location must be a non-negative integer" in str(lst.value)
-    assert "location must be a non-negative integer" in str(floating.value)
-    assert "location must be a non-negative integer" in str(negative.value)
-
-    # Testing color values
+def test_invalid_GamePiece_color():
+    # Invalid locations and x & y values are tested in the Square section
     with pt.raises(AssertionError) as wrong_color:
         o.GamePiece(0, "Hello", 0, 0)
     with pt.raises(AssertionError) as wrong_color2:
         o.GamePiece(0, 0, 0, 0)
 
-    assert "color must be 'black' or 'white'" in str(wrong_color.value)
-    assert "color must be 'black' or 'white'" in str(wrong_color2.value)
-
-    # Testing x & y values
-    with pt.raises(AssertionError) as x_string:
-        o.GamePiece(0, "black", "hello", 25)
-    with pt.raises(AssertionError) as y_string:
-        o.GamePiece(1, "black", 25, "hello")
-    with pt.raises(AssertionError) as x_floating:
-        o.GamePiece(2, "black", 25.5, 25)
-    with pt.raises(AssertionError) as y_floating:
-        o.GamePiece(3, "black", 25, 25.5)
-    with pt.raises(AssertionError) as x_lst:
-        o.GamePiece(4, "black", [2, 5], 25)
-    with pt.raises(AssertionError) as y_lst:
-        o.GamePiece(4, "black", 25, [2, 5])
-
-    assert "x & y values must be integers" in str(x_string.value)
-    assert "x & y values must be integers" in str(y_string.value)
-    assert "x & y values must be integers" in str(x_floating.value)
-    assert "x & y values must be integers" in str(y_floating.value)
-    assert "x & y values must be integers" in str(x_lst.value)
-    assert "x & y values must be integers" in str(y_lst.value)
+    assert wrong_color.value.args[0] == "color must be 'black' or 'white'"
+    assert wrong_color2.value.args[0] == "color must be 'black' or 'white'"
 
 
 # Valid objects
-def test_change_color():
+@pt.mark.parametrize("toggles, expected", [
+    (0, "white"),
+    (1, "black"),
+    (2, "white"),
+    (3, "black"),
+    (4, "white"),
+])
+def test_change_color(toggles, expected):
     # change_color is the only method in GamePiece that does not require drawing
     # anything in the window.
     test = o.GamePiece(0, "white", 0, 0)
-    assert test.color == "white"
+    for toggle in range(toggles):
+        test.change_color()
+    assert test.color == expected
+
+
+class FakeCanvas:
+    '''
+    Records canvas calls so drawing can be tested without a window.
+    '''
+    def __init__(self):
+        self.items = {}
+
+    def create_oval(self, *coords, fill, outline):
+        item = len(self.items) + 1
+        self.items[item] = [coords, fill]
+        return item
+
+    def itemconfig(self, item, fill, outline):
+        self.items[item][1] = fill
+
+
+def test_GamePiece_slots():
+    test = o.GamePiece(0, "white", 0, 0)
+    assert not hasattr(test, "__dict__")
+    with pt.raises(AttributeError):
+        test.size = 10
+
+
+def test_draw_tile():
+    canvas = FakeCanvas()
+    test = o.GamePiece(0, "black", 25, -25)
+    test.draw_tile(canvas)
+    r = o.RADIUS
+    assert canvas.items == {1: [(25 - r, 25 - r, 25 + r, 25 + r), "black"]}
+    assert test.item == 1
+
+    # Redrawing recolors the same canvas item
     test.change_color()
+    test.draw_tile(canvas)
+    assert canvas.items == {1: [(25 - r, 25 - r, 25 + r, 25 + r), "white"]}
+
+
+def test_flip():
+    canvas = FakeCanvas()
+    test = o.GamePiece(0, "black", 25, -25)
+
+    # An undrawn tile only changes color
+    test.flip(canvas)
+    assert test.color == "white" and canvas.items == {}
+
+    test.draw_tile(canvas)
+    test.flip(canvas)
     assert test.color == "black"
-    test.change_color()
-    assert test.color == "white"
+    assert canvas.items[test.item][1] == "black"
+    assert len(canvas.items) == 1
+
+
+def test_GamePiece_repr():
+    assert repr(o.GamePiece(12, "black", 0, 0)) == "black @ 12"
 
 
 def test_peek():